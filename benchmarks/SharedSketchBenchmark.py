@@ -0,0 +1,139 @@
+import argparse
+import importlib
+import json
+import os
+import platform
+import time
+from multiprocessing import get_context
+from benchmarks.SketchBenchmark import parseDistribution
+
+# Shared sketch, and the single-process sketch it is compared against
+SKETCHES = {
+    "cms": (("count-min-sketch.SharedCountMinSketch", "SharedCountMinSketch"),
+            ("count-min-sketch.NumpyCountMinSketch", "NumpyCountMinSketch")),
+    "sbf": (("spectral-bloom-filter.SharedSpectralBloomFilter", "SharedSpectralBloomFilter"),
+            ("spectral-bloom-filter.SpectralBloomFilter", "SpectralBloomFilter")),
+}
+
+def loadClass(module, cls):
+    return getattr(importlib.import_module(module), cls)
+
+def insertChunks(sketch, addresses, chunkSize):
+    for start in range(0, len(addresses), chunkSize):
+        sketch.insertIPv4Array(addresses[start:start + chunkSize])
+
+def insertLane(sketch, lane, addresses, chunkSize, barrier, timings):
+    # Runs in a forked worker: attach to its own lane, wait for the others, then insert its share
+    laneSketch = sketch.attach(lane)
+    barrier.wait()
+    start = time.perf_counter()
+    insertChunks(laneSketch, addresses, chunkSize)
+    timings.put(time.perf_counter() - start)
+    laneSketch.close()
+
+def runShared(sketch, shares, chunkSize):
+    # Wall time from the moment every worker is ready until the last one finishes
+    context = get_context("fork")
+    barrier = context.Barrier(len(shares) + 1)
+    timings = context.Queue()
+    processes = [context.Process(target=insertLane, args=(sketch, lane, share, chunkSize, barrier, timings))
+                 for lane, share in enumerate(shares)]
+    for process in processes:
+        process.start()
+    barrier.wait()
+    start = time.perf_counter()
+    workerTimes = [timings.get() for _ in processes]
+    elapsed = time.perf_counter() - start
+    for process in processes:
+        process.join()
+    return elapsed, max(workerTimes)
+
+def runCase(sketchName, workers, data, args):
+    import numpy as np
+    (sharedModule, sharedClass), _ = SKETCHES[sketchName]
+    addresses = data.inputArray
+    shares = np.array_split(addresses, workers)
+    elapsed = float("inf")
+    for _ in range(args.repeat):
+        sketch = loadClass(sharedModule, sharedClass)(args.depth, args.width, numLanes=workers)
+        try:
+            elapsed = min(elapsed, runShared(sketch, shares, args.chunk_size)[0])
+            # Every worker has finished, so no estimate may be below the true count
+            keys, counts = data.get_actual_count_arrays()
+            estimates = sketch.queryIPv4Array(keys).astype(np.int64)
+            total = sketch.total()
+        finally:
+            sketch.close()
+    return {
+        "sketch": sketchName,
+        "workers": workers,
+        "seconds": elapsed,
+        "insertsPerSec": len(addresses) / elapsed,
+        "underCounted": int((estimates < counts).sum()),
+        "meanOverCount": float((estimates - counts).mean()),
+        "counters": total,
+    }
+
+def runBaseline(sketchName, data, args):
+    _, (module, cls) = SKETCHES[sketchName]
+    elapsed = float("inf")
+    for _ in range(args.repeat):
+        sketch = loadClass(module, cls)(args.depth, args.width)
+        start = time.perf_counter()
+        insertChunks(sketch, data.inputArray, args.chunk_size)
+        elapsed = min(elapsed, time.perf_counter() - start)
+    return sketch, {"sketch": sketchName, "workers": 0, "seconds": elapsed,
+                    "insertsPerSec": data.inputSetSize / elapsed}
+
+def run(args):
+    import numpy as np
+    from common.IPV4ExperimentData import NumpyExperimentData
+    distribution, alpha = parseDistribution(args.distribution)
+    data = NumpyExperimentData(dataSetSize=args.data_set_size, inputSetSize=args.stream_size,
+                               distribution=distribution, alpha=alpha, seed=args.seed)
+    print(f"{os.cpu_count()} CPU(s), {args.stream_size:,} keys, depth {args.depth}, width {args.width}")
+    results = []
+    for sketchName in args.sketches:
+        baselineSketch, baseline = runBaseline(sketchName, data, args)
+        print(f"{sketchName:<4} single process      {baseline['insertsPerSec']:>12,.0f} ins/s")
+        results.append(baseline)
+        for workers in args.workers:
+            result = runCase(sketchName, workers, data, args)
+            # Plain CMS lanes add up to exactly the single-process counters
+            counters = result.pop("counters")
+            result["matchesSingleProcess"] = bool(np.array_equal(counters, np.asarray(baselineSketch.filter).reshape(counters.shape)))
+            result["speedup"] = result["insertsPerSec"] / baseline["insertsPerSec"]
+            print(f"{sketchName:<4} {workers:>2} worker(s)        {result['insertsPerSec']:>12,.0f} ins/s  "
+                  f"x{result['speedup']:.2f}  under-counted {result['underCounted']}  "
+                  f"mean over-count {result['meanOverCount']:.2f}  same counters {result['matchesSingleProcess']}")
+            results.append(result)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to: {args.output}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Insert throughput of the shared-memory sketches against worker count")
+    parser.add_argument("--output", default="shared_bench_results.json")
+    parser.add_argument("--sketches", nargs="+", default=["cms", "sbf"], choices=sorted(SKETCHES))
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4, 8])
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--width", type=int, default=100000)
+    parser.add_argument("--distribution", default="zipf:1.1")
+    parser.add_argument("--stream-size", type=int, default=1000000)
+    parser.add_argument("--data-set-size", type=int, default=100000)
+    parser.add_argument("--chunk-size", type=int, default=65536)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    run(parser.parse_args(argv))
+
+if __name__ == "__main__":
+    main()
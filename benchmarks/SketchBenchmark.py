@@ -0,0 +1,186 @@
+import argparse
+import importlib
+import json
+import platform
+import resource
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from multiprocessing import get_context
+
+SKETCHES = {
+    "cms": ("count-min-sketch.CountMinSketch", "CountMinSketch", {}),
+    "cms-numpy": ("count-min-sketch.NumpyCountMinSketch", "NumpyCountMinSketch", {}),
+    "sbf": ("spectral-bloom-filter.SpectralBloomFilter", "SpectralBloomFilter", {}),
+    "sbf-uint8": ("spectral-bloom-filter.SpectralBloomFilter", "SpectralBloomFilter", {"counters": "uint8"}),
+    "sbf-uint16": ("spectral-bloom-filter.SpectralBloomFilter", "SpectralBloomFilter", {"counters": "uint16"}),
+    "sbf-uint32": ("spectral-bloom-filter.SpectralBloomFilter", "SpectralBloomFilter", {"counters": "uint32"}),
+    "sbf-escalating": ("spectral-bloom-filter.SpectralBloomFilter", "SpectralBloomFilter", {"counters": "escalating"}),
+}
+
+# Metric name -> True when higher is better
+METRICS = {
+    "insertsPerSec": True,
+    "queryP50Us": False,
+    "queryP99Us": False,
+    "bytesPerCounter": False,
+    "peakRssKb": False,
+}
+
+def loadSketch(name):
+    module, cls, options = SKETCHES[name]
+    sketchClass = getattr(importlib.import_module(module), cls)
+    return lambda depth, width: sketchClass(depth, width, **options)
+
+def parseDistribution(spec):
+    # "zipf:1.1" or "uniform"
+    name, _, alpha = spec.partition(":")
+    if name == "uniform":
+        return "random", 1.2
+    if name == "zipf":
+        return "zipf", float(alpha or 1.2)
+    raise ValueError(f"Unknown distribution: {spec}")
+
+def counterBytes(sketch):
+    # Bytes held by the counters themselves: array buffers, or list objects plus distinct int objects
+    counters = sketch.filter
+    if isinstance(counters, array):
+        return counters.itemsize * len(counters), len(counters)
+    if hasattr(counters, "nbytes"):
+        return counters.nbytes, getattr(counters, "size", len(counters))
+    rows = counters if counters and isinstance(counters[0], list) else [counters]
+    total = sys.getsizeof(counters) if rows is counters else 0
+    seen = set()
+    cells = 0
+    for row in rows:
+        total += sys.getsizeof(row)
+        cells += len(row)
+        for value in row:
+            if id(value) not in seen:
+                seen.add(id(value))
+                total += sys.getsizeof(value)
+    return total, cells
+
+def percentile(sortedValues, q):
+    return sortedValues[min(len(sortedValues) - 1, int(q * len(sortedValues)))]
+
+def runCase(case):
+    # Runs in a fresh process so peak RSS belongs to this case only
+    from common.IPV4ExperimentData import NumpyExperimentData
+    distribution, alpha = parseDistribution(case["distribution"])
+    data = NumpyExperimentData(dataSetSize=case["dataSetSize"], inputSetSize=case["streamSize"],
+                               distribution=distribution, alpha=alpha, seed=case["seed"])
+    inputSet = data.inputSet
+    queries = data.dataSet[:case["queries"]]
+    rssBefore = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Best of several fresh passes, single-core timings are noisy
+    insertTime = float("inf")
+    for _ in range(case["repeat"]):
+        sketch = loadSketch(case["sketch"])(case["depth"], case["width"])
+        start = time.perf_counter()
+        for ip in inputSet:
+            sketch.insertElem(ip)
+        insertTime = min(insertTime, time.perf_counter() - start)
+
+    latencies = []
+    for ip in queries:
+        start = time.perf_counter_ns()
+        sketch.getFrequency(ip)
+        latencies.append(time.perf_counter_ns() - start)
+    latencies.sort()
+
+    totalBytes, cells = counterBytes(sketch)
+    return dict(case, **{
+        "insertsPerSec": len(inputSet) / insertTime,
+        "queryP50Us": percentile(latencies, 0.50) / 1000,
+        "queryP99Us": percentile(latencies, 0.99) / 1000,
+        "bytesPerCounter": totalBytes / cells,
+        "peakRssKb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "peakRssDeltaKb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rssBefore,
+    })
+
+def caseKey(result):
+    return f"{result['sketch']}/d{result['depth']}/w{result['width']}/{result['distribution']}/n{result['streamSize']}"
+
+def run(args):
+    cases = [
+        {"sketch": sketch, "depth": depth, "width": width, "distribution": distribution, "streamSize": streamSize,
+         "dataSetSize": args.data_set_size, "queries": args.queries, "repeat": args.repeat, "seed": args.seed}
+        for sketch, depth, width, distribution, streamSize
+        in product(args.sketches, args.depths, args.widths, args.distributions, args.stream_sizes)
+    ]
+    results = []
+    executor = ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn"), max_tasks_per_child=1)
+    with executor:
+        for result in executor.map(runCase, cases):
+            print(f"{caseKey(result):<40} {result['insertsPerSec']:>12,.0f} ins/s  "
+                  f"p50 {result['queryP50Us']:6.2f}us  p99 {result['queryP99Us']:6.2f}us  "
+                  f"{result['bytesPerCounter']:6.2f} B/counter  {result['peakRssKb']:>8} KB")
+            results.append(result)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to: {args.output}")
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = {caseKey(result): result for result in json.load(f)["results"]}
+    with open(args.candidate) as f:
+        candidate = {caseKey(result): result for result in json.load(f)["results"]}
+
+    regressions = 0
+    for key in sorted(baseline.keys() & candidate.keys()):
+        for metric, higherIsBetter in METRICS.items():
+            old, new = baseline[key][metric], candidate[key][metric]
+            if not old:
+                continue
+            change = (new - old) / old
+            worse = -change if higherIsBetter else change
+            flag = "REGRESSION" if worse > args.threshold else ""
+            regressions += bool(flag)
+            if flag or args.verbose:
+                print(f"{key:<40} {metric:<16} {old:>14.2f} -> {new:>14.2f} ({change:+.1%}) {flag}")
+    for key in sorted(baseline.keys() ^ candidate.keys()):
+        print(f"{key:<40} only in {'baseline' if key in baseline else 'candidate'}")
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Throughput, latency and memory benchmarks for the sketches")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    runParser = commands.add_parser("run", help="Run the benchmark matrix and write JSON results")
+    runParser.add_argument("--output", default="bench_results.json")
+    runParser.add_argument("--sketches", nargs="+", default=["cms", "sbf"], choices=sorted(SKETCHES))
+    runParser.add_argument("--depths", nargs="+", type=int, default=[3, 5])
+    runParser.add_argument("--widths", nargs="+", type=int, default=[1000, 100000])
+    runParser.add_argument("--distributions", nargs="+", default=["zipf:1.1", "zipf:1.5", "uniform"])
+    runParser.add_argument("--stream-sizes", nargs="+", type=int, default=[10000, 100000])
+    runParser.add_argument("--data-set-size", type=int, default=10000)
+    runParser.add_argument("--queries", type=int, default=2000)
+    runParser.add_argument("--repeat", type=int, default=3)
+    runParser.add_argument("--seed", type=int, default=0)
+
+    compareParser = commands.add_parser("compare", help="Flag regressions between two result files")
+    compareParser.add_argument("baseline")
+    compareParser.add_argument("candidate")
+    compareParser.add_argument("--threshold", type=float, default=0.10)
+    compareParser.add_argument("--verbose", action="store_true")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        return run(args)
+    return compare(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
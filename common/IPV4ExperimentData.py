@@ -1,6 +1,7 @@
-from faker import Faker
+from collections import Counter
 import random
 import numpy as np
+from common.ipv4Utils import ipv4ToStrings
 
 class ExperimentData:
     def __init__(self, dataSetSize=100, inputSetSize=500, distribution='zipf', alpha=1.2):
@@ -8,6 +9,8 @@ class ExperimentData:
         self.inputSetSize = inputSetSize
         self.distribution = distribution
         self.alpha = alpha
+        # Faker is slow to import and only this class needs it
+        from faker import Faker
         self.fake = Faker()
         self.dataSet = []
         self.inputSet = []
@@ -28,4 +31,86 @@ class ExperimentData:
             raise ValueError("Distribution must be 'zipf' or 'random'")
             
     def get_actual_counts(self):
-        return {ip: self.inputSet.count(ip) for ip in set(self.inputSet)}
\ No newline at end of file
+        return dict(Counter(self.inputSet))
+
+class NumpyExperimentData:
+    # Same experiment as ExperimentData, with addresses kept as uint32 arrays.
+    # With chunkSize set the stream is never materialized: iter_chunks() regenerates
+    # it batch by batch from the seed, so very large inputs fit in memory.
+    def __init__(self, dataSetSize=100, inputSetSize=500, distribution='zipf', alpha=1.2, seed=None, chunkSize=None):
+        if distribution not in ('zipf', 'random'):
+            raise ValueError("Distribution must be 'zipf' or 'random'")
+        self.dataSetSize = dataSetSize
+        self.inputSetSize = inputSetSize
+        self.distribution = distribution
+        self.alpha = alpha
+        self.chunkSize = chunkSize
+        poolSeed, self._streamSeed = np.random.SeedSequence(seed).spawn(2)
+        self.dataArray = self._generate_pool(np.random.default_rng(poolSeed))
+        self.inputIndices = None if chunkSize else self._sample(np.random.default_rng(self._streamSeed), inputSetSize)
+        self._counts = None
+        self._dataSet = None
+        self._inputSet = None
+
+    def _generate_pool(self, rng):
+        # Distinct addresses, so counting by pool index equals counting by address
+        pool = np.unique(rng.integers(0, 1 << 32, size=self.dataSetSize, dtype=np.uint32))
+        while len(pool) < self.dataSetSize:
+            extra = rng.integers(0, 1 << 32, size=self.dataSetSize - len(pool), dtype=np.uint32)
+            pool = np.unique(np.concatenate([pool, extra]))
+        return rng.permutation(pool)
+
+    def _sample(self, rng, size):
+        if self.distribution == 'zipf':
+            # Modulo ensures we stay within the dataset bounds
+            return (rng.zipf(self.alpha, size) - 1) % self.dataSetSize
+        return rng.integers(0, self.dataSetSize, size=size)
+
+    def _iter_indices(self, chunkSize=None):
+        chunkSize = chunkSize or self.chunkSize or self.inputSetSize
+        if self.inputIndices is not None:
+            for start in range(0, self.inputSetSize, chunkSize):
+                yield self.inputIndices[start:start + chunkSize]
+            return
+        rng = np.random.default_rng(self._streamSeed)
+        for start in range(0, self.inputSetSize, chunkSize):
+            yield self._sample(rng, min(chunkSize, self.inputSetSize - start))
+
+    def iter_chunks(self, chunkSize=None):
+        for indices in self._iter_indices(chunkSize):
+            yield self.dataArray[indices]
+
+    @property
+    def inputArray(self):
+        if self.inputIndices is None:
+            raise ValueError("inputArray is not available in chunked mode, use iter_chunks()")
+        return self.dataArray[self.inputIndices]
+
+    @property
+    def dataSet(self):
+        if self._dataSet is None:
+            self._dataSet = ipv4ToStrings(self.dataArray)
+        return self._dataSet
+
+    @property
+    def inputSet(self):
+        if self._inputSet is None:
+            dataSet = self.dataSet
+            self._inputSet = [dataSet[i] for i in self.inputIndices.tolist()] if self.inputIndices is not None else [
+                ip for chunk in self.iter_chunks() for ip in ipv4ToStrings(chunk)]
+        return self._inputSet
+
+    def get_actual_count_arrays(self):
+        # (addresses, counts) for every address that appears in the stream, in one
+        # O(n) bincount pass over pool indices
+        if self._counts is None:
+            counts = np.zeros(self.dataSetSize, dtype=np.int64)
+            for indices in self._iter_indices():
+                counts += np.bincount(indices, minlength=self.dataSetSize)
+            seen = np.flatnonzero(counts)
+            self._counts = (self.dataArray[seen], counts[seen])
+        return self._counts
+
+    def get_actual_counts(self):
+        addresses, counts = self.get_actual_count_arrays()
+        return dict(zip(ipv4ToStrings(addresses), counts.tolist()))
@@ -0,0 +1,69 @@
+from array import array
+
+# Fixed-width counter types backed by the array module, itemsizes checked below
+FIXED_TYPECODES = {"uint8": "B", "uint16": "H", "uint32": "I"}
+COUNTER_TYPES = ("list", *FIXED_TYPECODES, "escalating")
+
+def _fixedArray(counterType, width):
+    typecode = FIXED_TYPECODES[counterType]
+    expected = int(counterType[4:]) // 8
+    if array(typecode).itemsize != expected:
+        # "I" is only guaranteed to be at least 2 bytes
+        typecode = "L" if array("L").itemsize == expected else typecode
+    counters = array(typecode, bytes(expected * width))
+    return counters, (1 << (8 * expected)) - 1
+
+class EscalatingCounters:
+    # Variable-length counters: every counter starts as one byte, and a counter that reaches
+    # ESCAPE is promoted to an unbounded int in a side table. Small counters stay tiny, hot
+    # counters never saturate.
+    ESCAPE = 255
+
+    def __init__(self, width):
+        self.base = array("B", bytes(width))
+        self.promoted = {}
+
+    def __len__(self):
+        return len(self.base)
+
+    def __getitem__(self, pos):
+        value = self.base[pos]
+        return self.promoted[pos] if value == self.ESCAPE else value
+
+    def __setitem__(self, pos, value):
+        if value < self.ESCAPE:
+            if self.base[pos] == self.ESCAPE:
+                del self.promoted[pos]
+            self.base[pos] = value
+        else:
+            self.base[pos] = self.ESCAPE
+            self.promoted[pos] = value
+
+    def __iter__(self):
+        promoted = self.promoted
+        for pos, value in enumerate(self.base):
+            yield promoted[pos] if value == self.ESCAPE else value
+
+    def __array__(self, dtype=None, copy=None):
+        import numpy as np
+        values = np.frombuffer(self.base, dtype=np.uint8).astype(dtype or np.uint64)
+        for pos, value in self.promoted.items():
+            values[pos] = value
+        return values
+
+    @property
+    def nbytes(self):
+        # One byte per counter plus the side table of promoted counters
+        import sys
+        return (len(self.base) + sys.getsizeof(self.promoted)
+                + sum(sys.getsizeof(value) for value in self.promoted.values()))
+
+def makeCounters(counterType, width):
+    # Counter storage and its saturation point; None means the counters never saturate
+    if counterType == "list":
+        return [0] * width, None
+    if counterType in FIXED_TYPECODES:
+        return _fixedArray(counterType, width)
+    if counterType == "escalating":
+        return EscalatingCounters(width), None
+    raise ValueError(f"Counters must be one of {list(COUNTER_TYPES)}")
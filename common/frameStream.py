@@ -0,0 +1,64 @@
+import cv2
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+class HeatmapVideoStream:
+    # Renders sketch states into a single reused figure and writes the frames straight
+    # to a video, with no intermediate image files
+    def __init__(self, videoPath, shape, fps=25, frameSize=(1280, 720), cmap='Wistia', frameStride=1, maxChangeOnly=False):
+        if frameStride < 1:
+            raise ValueError(f"frameStride must be at least 1, got {frameStride}")
+        self.frameSize = frameSize
+        self.frameStride = frameStride
+        self.maxChangeOnly = maxChangeOnly
+        self.updates = 0
+        self.frames = 0
+        self.lastMax = None
+        self.pending = None
+
+        # Sized so the rendered buffer already matches the video frame
+        self.figure = Figure(figsize=(frameSize[0] / 100, frameSize[1] / 100), dpi=100)
+        self.canvas = FigureCanvasAgg(self.figure)
+        ax = self.figure.add_subplot()
+        self.image = ax.imshow(np.zeros(shape), aspect='auto', cmap=cmap, vmin=0, vmax=1)
+        self.figure.colorbar(self.image, ax=ax, orientation='horizontal')
+        self.title = ax.set_title("")
+
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        self.writer = cv2.VideoWriter(str(videoPath), fourcc, fps, frameSize)
+
+    def update(self, state, title):
+        # Called after every insert; only sampled updates are rasterized
+        self.updates += 1
+        if self.maxChangeOnly:
+            state = np.asarray(state)
+            wanted = state.max() != self.lastMax
+        else:
+            wanted = self.updates % self.frameStride == 0
+        if not wanted:
+            # Sketch counters are updated in place, so this still shows the latest state at close()
+            self.pending = (state, title)
+            return False
+        self._writeFrame(state, title)
+        return True
+
+    def _writeFrame(self, state, title):
+        state = np.asarray(state)
+        self.lastMax = state.max()
+        self.pending = None
+        self.image.set_data(state)
+        self.image.set_clim(0, max(self.lastMax, 1))
+        self.title.set_text(title)
+        self.canvas.draw()
+        frame = cv2.cvtColor(np.asarray(self.canvas.buffer_rgba()), cv2.COLOR_RGBA2BGR)
+        if frame.shape[1::-1] != self.frameSize:
+            frame = cv2.resize(frame, self.frameSize)
+        self.writer.write(frame)
+        self.frames += 1
+
+    def close(self):
+        # The final state always makes it into the video
+        if self.pending is not None:
+            self._writeFrame(*self.pending)
+        self.writer.release()
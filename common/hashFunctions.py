@@ -0,0 +1,95 @@
+import mmh3
+from functools import lru_cache
+
+class _Hashing:
+    def __init__(self, numHashFuncs, width, cacheSize=0):
+        self.numHashFuncs = numHashFuncs
+        self.width = width
+        self.seeds = list(range(1, self.numHashFuncs + 1))
+        self.cacheSize = cacheSize
+        self._setPositionFunction(self._computePositions)
+
+    def _setPositionFunction(self, compute):
+        self.getPositions = lru_cache(maxsize=self.cacheSize)(compute) if self.cacheSize else compute
+
+    def instrument(self, stats):
+        # Counts mmh3 calls into stats.hashCalls; cache hits cost none. Uninstrumented
+        # hashers keep the plain function, so there is no overhead unless enabled.
+        compute, hashesPerElement = self._computePositions, self.hashesPerElement
+
+        def countedPositions(elem):
+            stats.hashCalls += hashesPerElement
+            return compute(elem)
+        self._setPositionFunction(countedPositions)
+
+class SeededHashing(_Hashing):
+    # One mmh3.hash call per seed, seeds are 1..k
+    name = "seeded"
+
+    @property
+    def hashesPerElement(self):
+        return self.numHashFuncs
+
+    def _computePositions(self, elem):
+        return [mmh3.hash(elem, seed) % self.width for seed in self.seeds]
+
+    def getRawHashes(self, elems):
+        # Width independent (k, n) hashes, reusable for any width
+        import numpy as np
+        hashes = np.array([[mmh3.hash(elem, seed) for elem in elems] for seed in self.seeds], dtype=np.int64)
+        return hashes.reshape(self.numHashFuncs, len(elems))
+
+    def positionsFromRaw(self, rawHashes, width):
+        return rawHashes % width
+
+    def getBatchPositions(self, elems):
+        return self.positionsFromRaw(self.getRawHashes(elems), self.width)
+
+class DoubleHashing(_Hashing):
+    # One 128-bit mmh3 call per element, position i is (h1 + i * step) mod width with
+    # step = 1 + h2 mod (width - 1), so a key never probes the same cell for every row
+    name = "double"
+    hashesPerElement = 1
+
+    def __init__(self, numHashFuncs, width, cacheSize=0):
+        super().__init__(numHashFuncs, width, cacheSize)
+        self.seed = self.seeds[0]
+
+    def _computePositions(self, elem):
+        h1, h2 = mmh3.hash64(elem, self.seed, signed=False)
+        width = self.width
+        # A zero step would probe one cell k times, so steps run 1..width-1
+        start, step = h1 % width, 1 + h2 % max(width - 1, 1)
+        return [(start + i * step) % width for i in range(self.numHashFuncs)]
+
+    def getRawHashes(self, elems):
+        # Width independent (2, n) hash halves, reusable for any width
+        import numpy as np
+        hashes = np.array([mmh3.hash64(elem, self.seed, signed=False) for elem in elems], dtype=np.uint64)
+        return hashes.reshape(len(elems), 2).T
+
+    def positionsFromRaw(self, rawHashes, width):
+        import numpy as np
+        start = (rawHashes[0] % np.uint64(width)).astype(np.int64)
+        step = 1 + (rawHashes[1] % np.uint64(max(width - 1, 1))).astype(np.int64)
+        steps = np.arange(self.numHashFuncs, dtype=np.int64)[:, None]
+        return (start + steps * step) % width
+
+    def getBatchPositions(self, elems):
+        return self.positionsFromRaw(self.getRawHashes(elems), self.width)
+
+HASHING_STRATEGIES = {strategy.name: strategy for strategy in (SeededHashing, DoubleHashing)}
+
+def makeHashing(hashing, numHashFuncs, width, cacheSize=0):
+    if hashing not in HASHING_STRATEGIES:
+        raise ValueError(f"Hashing must be one of {sorted(HASHING_STRATEGIES)}")
+    return HASHING_STRATEGIES[hashing](numHashFuncs, width, cacheSize=cacheSize)
+
+
+def getIPv4BatchPositions(hasher, addresses):
+    # Hashes each distinct uint32 address once, through the same bytes as its
+    # dotted-quad string, and returns (positions of distinct keys, inverse, counts)
+    import numpy as np
+    from common.ipv4Utils import ipv4ToBytes
+    distinct, inverse, counts = np.unique(np.asarray(addresses, dtype=np.uint32), return_inverse=True, return_counts=True)
+    return hasher.getBatchPositions(ipv4ToBytes(distinct)), inverse.reshape(-1), counts
@@ -0,0 +1,125 @@
+import cProfile
+import json
+import pstats
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+class SketchStats:
+    # Hot-path counters for a sketch, only collected after sketch.enableStats()
+    def __init__(self):
+        self.inserts = 0
+        self.queries = 0
+        self.hashCalls = 0
+        self.counterUpdates = 0
+        # Updates landing on a cell first claimed by a different key
+        self.collisions = 0
+        # Increments dropped because the counter was already at its maximum
+        self.saturated = 0
+        # Cells touched by more than one key
+        self.sharedCells = 0
+        self._owners = {}
+        self._sharedCells = set()
+
+    def recordInsert(self, elem, cells, updates):
+        self.inserts += 1
+        self.counterUpdates += updates
+        for cell in cells:
+            owner = self._owners.setdefault(cell, elem)
+            if owner != elem:
+                self.collisions += 1
+                if cell not in self._sharedCells:
+                    self._sharedCells.add(cell)
+                    self.sharedCells += 1
+
+    def recordQuery(self):
+        self.queries += 1
+
+    def merge(self, other):
+        # Cells of different sketches are distinct, so shared cell counts simply add up
+        for key in ("inserts", "queries", "hashCalls", "counterUpdates", "collisions", "saturated", "sharedCells"):
+            setattr(self, key, getattr(self, key) + getattr(other, key))
+        return self
+
+    def summary(self):
+        return {
+            "inserts": self.inserts,
+            "queries": self.queries,
+            "hashCalls": self.hashCalls,
+            "counterUpdates": self.counterUpdates,
+            "collisions": self.collisions,
+            "sharedCells": self.sharedCells,
+            "saturated": self.saturated,
+        }
+
+NULL_PHASE = nullcontext()
+
+class PhaseTimer:
+    # Wall and CPU time per named phase; a disabled timer hands out a shared no-op context
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.phases = {}
+
+    def phase(self, name):
+        return self._timed(name) if self.enabled else NULL_PHASE
+
+    @contextmanager
+    def _timed(self, name):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            totals = self.phases.setdefault(name, {"wall": 0.0, "cpu": 0.0, "calls": 0})
+            totals["wall"] += time.perf_counter() - wall
+            totals["cpu"] += time.process_time() - cpu
+            totals["calls"] += 1
+
+    def merge(self, phases):
+        # Adds timings collected elsewhere, e.g. in a pool worker
+        for name, other in phases.items():
+            totals = self.phases.setdefault(name, {"wall": 0.0, "cpu": 0.0, "calls": 0})
+            for key in totals:
+                totals[key] += other[key]
+
+class Instrumentation:
+    # Phase timers, sketch stats and an optional cProfile run for one driver run
+    def __init__(self, enabled=False, profile=False):
+        self.enabled = enabled or profile
+        self.timer = PhaseTimer(self.enabled)
+        self.sketchStats = SketchStats()
+        self.profiler = cProfile.Profile() if profile else None
+
+    def phase(self, name):
+        return self.timer.phase(name)
+
+    def start(self):
+        if self.profiler is not None:
+            self.profiler.enable()
+
+    def stop(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+
+    def save(self, directoryPath, fileName="instrumentation.json"):
+        if not self.enabled:
+            return None
+        directoryPath = Path(directoryPath)
+        summary = {"phases": self.timer.phases}
+        if self.sketchStats.inserts:
+            summary["sketchStats"] = self.sketchStats.summary()
+        if self.profiler is not None:
+            profilePath = directoryPath / "profile.prof"
+            self.profiler.dump_stats(profilePath)
+            stats = pstats.Stats(self.profiler).sort_stats("cumulative")
+            summary["profile"] = {
+                "path": str(profilePath),
+                "top": [
+                    {"function": f"{file}:{line}({func})", "calls": calls, "tottime": tottime, "cumtime": cumtime}
+                    for (file, line, func), (_, calls, tottime, cumtime, _) in
+                    sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:25]
+                ],
+            }
+        savePath = directoryPath / fileName
+        with open(savePath, "w") as f:
+            json.dump(summary, f, indent=2)
+        return savePath
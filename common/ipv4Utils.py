@@ -0,0 +1,58 @@
+import numpy as np
+
+def ipv4ToStrings(addresses):
+    # Dotted-quad strings for an array of uint32 addresses
+    octets = (np.asarray(addresses, dtype=np.uint32)[:, None] >> np.array([24, 16, 8, 0], dtype=np.uint32)) & 0xFF
+    return [f"{a}.{b}.{c}.{d}" for a, b, c, d in octets.tolist()]
+
+def ipv4FromStrings(ips):
+    return np.array([int.from_bytes(bytes(map(int, ip.split("."))), "big") for ip in ips], dtype=np.uint32)
+
+OCTETS = [str(i).encode() for i in range(256)]
+
+def ipv4ToBytes(addresses):
+    # ASCII dotted-quad bytes; mmh3 hashes these exactly like the equivalent str
+    octets = (np.asarray(addresses, dtype=np.uint32)[:, None] >> np.array([24, 16, 8, 0], dtype=np.uint32)) & 0xFF
+    return [b".".join((OCTETS[a], OCTETS[b], OCTETS[c], OCTETS[d])) for a, b, c, d in octets.tolist()]
+
+def parseIPv4Lines(buffer):
+    # Parses the IPv4 address at the start of every line of a uint8 buffer without
+    # building per-line strings. Lines that do not start with a valid address are skipped.
+    buffer = np.asarray(buffer, dtype=np.uint8)
+    if buffer.size == 0:
+        return np.zeros(0, dtype=np.uint32)
+    starts = np.concatenate(([0], np.flatnonzero(buffer == ord("\n")) + 1))
+    starts = starts[starts < buffer.size]
+    # At most 15 characters per address plus its terminator, padded so every window is in bounds
+    padded = np.concatenate((buffer, np.zeros(16, dtype=np.uint8)))
+    columns = padded[np.arange(16)[:, None] + starts]
+
+    count = len(starts)
+    # Narrow dtypes keep the per-column passes cheap; overflowing values are already invalid
+    value = np.zeros(count, dtype=np.uint32)
+    octet = np.zeros(count, dtype=np.uint32)
+    digits = np.zeros(count, dtype=np.uint8)
+    dots = np.zeros(count, dtype=np.uint8)
+    valid = np.ones(count, dtype=bool)
+    active = np.ones(count, dtype=bool)
+    endChar = np.zeros(count, dtype=np.uint8)
+    for column in columns:
+        digit = column - np.uint8(ord("0"))
+        isDigit = active & (digit < 10)
+        isDot = active & (column == ord("."))
+        ended = active & ~(isDigit | isDot)
+        endChar = np.where(ended, column, endChar)
+        # A leading zero would hash differently from the canonical string
+        valid &= ~(isDigit & (digits == 1) & (octet == 0))
+        octet = np.where(isDigit, octet * 10 + digit, octet)
+        digits += isDigit
+        valid &= ~(isDot & ((digits == 0) | (digits > 3) | (octet > 255)))
+        value = np.where(isDot, (value << 8) | octet, value)
+        octet[isDot] = 0
+        digits[isDot] = 0
+        dots += isDot
+        active &= ~ended
+    # The address has to end at whitespace, a comma or the end of the buffer
+    valid &= ~active & np.isin(endChar, np.frombuffer(b"\0\t\n\r ,", dtype=np.uint8))
+    valid &= (dots == 3) & (digits > 0) & (digits <= 3) & (octet <= 255)
+    return ((value << 8) | octet)[valid]
@@ -0,0 +1,50 @@
+import mmap
+import numpy as np
+from common.ipv4Utils import parseIPv4Lines
+
+def _mapFile(path):
+    with open(path, "rb") as f:
+        if f.seek(0, 2) == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def iterLogAddresses(path, chunkBytes=4 << 20):
+    # uint32 arrays of the leading IPv4 address of every line of a text log,
+    # parsed from a memory map in chunks that end on a line boundary
+    mm = _mapFile(path)
+    if mm is None:
+        return
+    with mm:
+        start = 0
+        while start < len(mm):
+            end = min(start + chunkBytes, len(mm))
+            if end < len(mm):
+                newline = mm.rfind(b"\n", start, end)
+                # A single line longer than the chunk is read whole
+                end = newline + 1 if newline >= 0 else (mm.find(b"\n", end) + 1 or len(mm))
+            yield parseIPv4Lines(np.frombuffer(mm, dtype=np.uint8, count=end - start, offset=start))
+            start = end
+
+def iterPackedAddresses(path, chunkSize=1 << 22, byteorder="big"):
+    # uint32 arrays from a binary file of packed 4-byte addresses
+    mm = _mapFile(path)
+    if mm is None:
+        return
+    with mm:
+        if len(mm) % 4:
+            raise ValueError("Packed address file size must be a multiple of 4 bytes")
+        addresses = np.frombuffer(mm, dtype=">u4" if byteorder == "big" else "<u4")
+        try:
+            for start in range(0, len(addresses), chunkSize):
+                yield addresses[start:start + chunkSize].astype(np.uint32)
+        finally:
+            # The view has to go before the map can close
+            del addresses
+
+def ingest(sketch, chunks):
+    # Feeds address chunks into any sketch with insertIPv4Array, returns the number inserted
+    total = 0
+    for addresses in chunks:
+        sketch.insertIPv4Array(addresses)
+        total += len(addresses)
+    return total
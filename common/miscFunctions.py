@@ -1,15 +1,134 @@
-import cv2
 import glob
+import json
 import os
 import re
-from tqdm import tqdm
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+TARGET_SIZE = (1280, 720)
+
+def _loadFrame(path, targetSize):
+    import cv2
+    img = cv2.imread(path)
+    # Frames rendered at the video size go straight to the writer
+    if img is not None and (img.shape[1], img.shape[0]) != targetSize:
+        img = cv2.resize(img, targetSize)
+    return img
+
+def iterFrames(paths, targetSize=TARGET_SIZE, workers=None, maxPending=None):
+    # (path, frame) in the order of paths, decoded and resized on a thread pool. cv2 releases
+    # the GIL while decoding, so workers overlap with each other and with the consumer. At
+    # most maxPending frames are in flight, which bounds memory when the writer falls behind.
+    workers = workers or min(8, os.cpu_count() or 1)
+    maxPending = maxPending or 2 * workers
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for path in paths:
+            pending.append((path, executor.submit(_loadFrame, path, targetSize)))
+            if len(pending) >= maxPending:
+                path, frame = pending.popleft()
+                yield path, frame.result()
+        while pending:
+            path, frame = pending.popleft()
+            yield path, frame.result()
+
+def _frameEntry(path, skipped=False):
+    # Unreadable frames are recorded too, so the next run still sees the same prefix
+    stat = os.stat(path) if os.path.exists(path) else None
+    return [os.path.basename(path), stat.st_size if stat else None, stat.st_mtime_ns if stat else None, skipped]
+
+def _videoEntry(videoPath):
+    stat = os.stat(videoPath)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def _resumableFrames(videoPath, manifestPath, paths, fps, targetSize):
+    # Manifest entries of the frames already handled, when an earlier run wrote a prefix of
+    # these exact images with the same settings and the video is still the one it wrote,
+    # otherwise none
+    if not (os.path.exists(videoPath) and os.path.exists(manifestPath)):
+        return []
+    with open(manifestPath) as f:
+        previous = json.load(f)
+    done = previous["frames"]
+    if (previous["fps"], previous["size"]) != (fps, list(targetSize)) or len(done) > len(paths):
+        return []
+    if previous.get("video") != _videoEntry(videoPath):
+        return []
+    current = [_frameEntry(path)[:3] for path in paths[:len(done)]]
+    return done if current == [entry[:3] for entry in done] else []
+
+def encodeVideo(paths, videoPath, fps=25, targetSize=TARGET_SIZE, workers=None, maxPending=None, resume=False, progress=None):
+    # Encodes the frame images in paths, in order, into one mp4. Unreadable frames are skipped.
+    # With resume=True a sidecar manifest records which images the video holds: a rerun with
+    # no new frames does nothing, and when frames were only appended the existing video is
+    # copied through and just the new images are decoded. mp4v is lossy, so copied frames
+    # go through one more encode.
+    import cv2
+    paths = list(paths)
+    start = time.perf_counter()
+    manifestPath = f"{videoPath}.frames.json"
+    done = _resumableFrames(videoPath, manifestPath, paths, fps, targetSize) if resume else []
+    inVideo = sum(not entry[3] for entry in done)
+    result = {"video": videoPath, "frames": 0, "reused": 0, "skipped": [], "upToDate": False}
+    if done and len(done) == len(paths):
+        result.update(frames=inVideo, reused=inVideo, upToDate=True, seconds=time.perf_counter() - start, framesPerSec=0.0,
+                      skipped=[path for path, entry in zip(paths, done) if entry[3]])
+        return result
+
+    # Written next to the target and renamed at the end, so a resumable video is always complete
+    tempPath = f"{videoPath}.partial.mp4"
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    out = cv2.VideoWriter(tempPath, fourcc, fps, targetSize)
+    try:
+        if done:
+            existing = cv2.VideoCapture(videoPath)
+            while result["reused"] < inVideo:
+                ok, img = existing.read()
+                if not ok:
+                    break
+                out.write(img)
+                result["reused"] += 1
+            existing.release()
+            if result["reused"] < inVideo:
+                # The video is shorter than its manifest says, start over
+                out.release()
+                out = cv2.VideoWriter(tempPath, fourcc, fps, targetSize)
+                result["reused"], done = 0, []
+
+        written = list(done)
+        frames = iterFrames(paths[len(done):], targetSize, workers, maxPending)
+        for path, img in (progress(frames, len(paths) - len(done)) if progress else frames):
+            if img is None:
+                result["skipped"].append(path)
+            else:
+                out.write(img)
+            written.append(_frameEntry(path, img is None))
+        out.release()
+        os.replace(tempPath, videoPath)
+    except BaseException:
+        out.release()
+        if os.path.exists(tempPath):
+            os.remove(tempPath)
+        raise
+    if resume:
+        with open(manifestPath, "w") as f:
+            json.dump({"fps": fps, "size": list(targetSize), "frames": written, "video": _videoEntry(videoPath)}, f)
+    elif os.path.exists(manifestPath):
+        # The manifest described the video just replaced
+        os.remove(manifestPath)
+
+    seconds = time.perf_counter() - start
+    result.update(frames=sum(not entry[3] for entry in written), seconds=seconds,
+                  framesPerSec=(len(paths) - len(done)) / seconds)
+    return result
+
+def create_video_from_dir(directory_path, output_name="output_video.mp4", fps=25, workers=None, resume=False):
+    from tqdm import tqdm
 
-def create_video_from_dir(directory_path, output_name="output_video.mp4", fps=25):
-    target_size = (1280, 720)
-    
     # 1. Get all images (adjust extensions as needed)
     images = glob.glob(os.path.join(directory_path, "*.png"))
-    
+
     # 2. Sort files numerically (so frame10 comes after frame2)
     images.sort(key=lambda f: int(re.sub(r'\D', '', f) or 0))
 
@@ -17,20 +136,14 @@ def create_video_from_dir(directory_path, output_name="output_video.mp4", fps=25
         print("No images found in the directory.")
         return
 
-    # 3. Setup Video Writer
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    # 3. Decode and resize on a thread pool while the writer encodes
     video_path = os.path.join(directory_path, output_name)
-    out = cv2.VideoWriter(video_path, fourcc, fps, target_size)
-
-
-    for filename in tqdm(images, desc=f"Processing {len(images)} frames..."):
-        img = cv2.imread(filename)
-        if img is not None:
-            # Standardize size
-            img = cv2.resize(img, target_size)
-            out.write(img)
-        else:
-            print(f"Warning: Could not read {filename}")
-
-    out.release()
-    print(f"Video saved successfully: {video_path}")
\ No newline at end of file
+    progress = lambda frames, total: tqdm(frames, total=total, desc=f"Processing {total} frames...")
+    result = encodeVideo(images, video_path, fps, workers=workers, resume=resume, progress=progress)
+    for filename in result["skipped"]:
+        print(f"Warning: Could not read {filename}")
+    if result["upToDate"]:
+        print(f"Video is up to date: {video_path}")
+        return result
+    print(f"Video saved successfully: {video_path} ({result['framesPerSec']:.1f} frames/s)")
+    return result
@@ -0,0 +1,15 @@
+from concurrent.futures import ProcessPoolExecutor
+
+def _initWorker():
+    # Workers only ever render to files
+    import matplotlib
+    matplotlib.use("Agg")
+
+def mapInOrder(func, items, workers=1, desc=None):
+    # Results come back in the order of items, whether run serially or on a process pool
+    from tqdm import tqdm
+    items = list(items)
+    if workers is None or workers <= 1:
+        return [func(item) for item in tqdm(items, desc=desc)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_initWorker) as executor:
+        return list(tqdm(executor.map(func, items), total=len(items), desc=desc))
@@ -0,0 +1,122 @@
+import csv
+import importlib.util
+from pathlib import Path
+import numpy as np
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+def hasParquetEngine():
+    return any(importlib.util.find_spec(engine) is not None for engine in ("pyarrow", "fastparquet"))
+
+def computeMetrics(parameter, actual, estimate, quantiles=QUANTILES):
+    # Error metrics for every iteration in one pass: rows are grouped by parameter value
+    # and each reduction runs over all groups at once
+    order = np.argsort(parameter, kind="stable")
+    parameter, actual, estimate = parameter[order], actual[order], estimate[order]
+    relativeError = (estimate - actual) / actual
+    values, starts, sizes = np.unique(parameter, return_index=True, return_counts=True)
+    metrics = {
+        "parameter": values,
+        "keys": sizes,
+        "meanRelativeError": np.add.reduceat(relativeError, starts) / sizes,
+        "maxRelativeError": np.maximum.reduceat(relativeError, starts),
+        "overEstimateRate": np.add.reduceat(estimate > actual, starts) / sizes,
+    }
+    # Sorting by (group, error) puts every group's errors in order, then each quantile is
+    # interpolated between two neighbouring ranks the same way np.quantile does
+    groups = np.repeat(np.arange(len(values)), sizes)
+    sortedError = relativeError[np.lexsort((relativeError, groups))]
+    for q in quantiles:
+        rank = q * (sizes - 1)
+        low = np.floor(rank).astype(np.int64)
+        high = np.ceil(rank).astype(np.int64)
+        lowValue, highValue = sortedError[starts + low], sortedError[starts + high]
+        metrics[f"p{q * 100:g}RelativeError"] = lowValue + (rank - low) * (highValue - lowValue)
+    return metrics
+
+class ResultsStore:
+    # One row per (iteration, key) with the iteration parameter, the actual count and the
+    # estimate. Rows are collected per iteration and concatenated once into columns.
+    def __init__(self, parameterName):
+        self.parameterName = parameterName
+        self._chunks = []
+        self._columns = None
+
+    def add(self, parameterValue, actualCounts, estimates):
+        keys = list(actualCounts)
+        self._chunks.append({
+            self.parameterName: np.full(len(keys), parameterValue, dtype=np.int64),
+            "key": np.array(keys, dtype=str),
+            "actual": np.fromiter(actualCounts.values(), dtype=np.int64, count=len(keys)),
+            "estimate": np.fromiter((estimates[key] for key in keys), dtype=np.int64, count=len(keys)),
+        })
+        self._columns = None
+
+    @property
+    def columns(self):
+        if self._columns is None:
+            names = (self.parameterName, "key", "actual", "estimate")
+            self._columns = {name: np.concatenate([chunk[name] for chunk in self._chunks]) if self._chunks
+                             else np.zeros(0, dtype=str if name == "key" else np.int64) for name in names}
+            self._chunks = [self._columns] if self._chunks else []
+        return self._columns
+
+    def __len__(self):
+        return len(self.columns["key"])
+
+    def parameterValues(self):
+        return np.unique(self.columns[self.parameterName])
+
+    def metrics(self, quantiles=QUANTILES):
+        columns = self.columns
+        metrics = computeMetrics(columns[self.parameterName], columns["actual"], columns["estimate"], quantiles)
+        return {self.parameterName: metrics.pop("parameter"), **metrics}
+
+    def frame(self, parameterValue):
+        # Actual and estimated counts of one iteration, indexed by key, for plotting
+        import pandas as pd
+        columns = self.columns
+        rows = columns[self.parameterName] == parameterValue
+        return pd.DataFrame({
+            "actualCounts": columns["actual"][rows],
+            "estimatedCounts": columns["estimate"][rows],
+        }, index=pd.Index(columns["key"][rows], name="key"))
+
+    def save(self, directoryPath, fileName="results", fileFormat=None):
+        # Parquet when an engine is installed, otherwise compressed NPZ
+        fileFormat = fileFormat or ("parquet" if hasParquetEngine() else "npz")
+        if fileFormat == "parquet":
+            import pandas as pd
+            savePath = Path(directoryPath) / f"{fileName}.parquet"
+            pd.DataFrame(self.columns).to_parquet(savePath, index=False)
+        elif fileFormat == "npz":
+            savePath = Path(directoryPath) / f"{fileName}.npz"
+            np.savez_compressed(savePath, **self.columns)
+        else:
+            raise ValueError(f"Unknown results format: {fileFormat}")
+        return savePath
+
+    @classmethod
+    def load(cls, path, parameterName=None):
+        path = Path(path)
+        if path.suffix == ".parquet":
+            import pandas as pd
+            table = pd.read_parquet(path)
+            columns = {name: table[name].to_numpy() for name in table.columns}
+        else:
+            with np.load(path) as table:
+                columns = {name: table[name] for name in table.files}
+        parameterName = parameterName or next(name for name in columns if name not in ("key", "actual", "estimate"))
+        store = cls(parameterName)
+        store._chunks = [columns]
+        return store
+
+def saveMetrics(metrics, directoryPath, fileName="metrics.csv"):
+    # One small CSV with a row per iteration
+    savePath = Path(directoryPath) / fileName
+    names = list(metrics)
+    with open(savePath, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(names)
+        writer.writerows(zip(*(metrics[name].tolist() for name in names)))
+    return savePath
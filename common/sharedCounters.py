@@ -0,0 +1,50 @@
+from multiprocessing import shared_memory
+import numpy as np
+
+def checkLane(lane, numLanes):
+    if not 0 <= lane < numLanes:
+        raise ValueError(f"Lane {lane} out of range for {numLanes} lanes")
+
+class SharedLanes:
+    # numLanes blocks of uint64 counters of the given shape in one shared memory segment.
+    # Every writer process owns one lane and is its only writer, so updates need no locks,
+    # and readers sum the lanes. Counters only grow, so a sum read while writers are busy
+    # still covers every update that finished before the read.
+    def __init__(self, numLanes, shape, name=None):
+        if numLanes < 1:
+            raise ValueError("numLanes must be at least 1")
+        self.numLanes = numLanes
+        self.shape = tuple(shape)
+        self.laneSize = int(np.prod(self.shape))
+        size = numLanes * self.laneSize * 8
+        # The creating process owns the segment and unlinks it on close, others only detach
+        self.owner = name is None
+        self.memory = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        if self.memory.size < size:
+            self.memory.close()
+            raise ValueError(f"Shared memory {name} holds {self.memory.size} bytes, expected {size}")
+        self.lanes = np.ndarray((numLanes,) + self.shape, dtype=np.uint64, buffer=self.memory.buf)
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    def lane(self, lane):
+        checkLane(lane, self.numLanes)
+        return self.lanes[lane]
+
+    def laneCounters(self, lane):
+        # Flat view of one lane that reads and writes plain ints, for per-element updates
+        checkLane(lane, self.numLanes)
+        start = lane * self.laneSize * 8
+        return self.memory.buf[start:start + self.laneSize * 8].cast("Q")
+
+    def total(self):
+        return self.lanes.sum(axis=0)
+
+    def close(self):
+        # Views handed out by lane() and laneCounters() must be dropped first
+        self.lanes = None
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
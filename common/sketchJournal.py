@@ -0,0 +1,54 @@
+from array import array
+
+class SketchJournal:
+    # Change log of (row, column, delta) per step with a full checkpoint every
+    # checkpointInterval steps, so any past state is rebuilt in O(changes since checkpoint)
+    def __init__(self, numRows, width, checkpointInterval=1000, initialState=None):
+        if checkpointInterval < 1:
+            raise ValueError("checkpointInterval must be at least 1")
+        self.numRows = numRows
+        self.width = width
+        self.checkpointInterval = checkpointInterval
+        self.rows = array('H')
+        self.columns = array('I')
+        self.deltas = array('q')
+        # stepOffsets[s] is the number of changes recorded before step s + 1
+        self.stepOffsets = array('Q', [0])
+        self.current = array('q', initialState) if initialState is not None else array('q', bytes(8 * numRows * width))
+        if len(self.current) != numRows * width:
+            raise ValueError("initialState does not match the journal dimensions")
+        self.checkpoints = {0: array('q', self.current)}
+
+    @property
+    def steps(self):
+        return len(self.stepOffsets) - 1
+
+    def record(self, changes):
+        # One step, e.g. one insert; changes is an iterable of (row, column, delta)
+        for row, column, delta in changes:
+            self.rows.append(row)
+            self.columns.append(column)
+            self.deltas.append(delta)
+            self.current[row * self.width + column] += delta
+        self.stepOffsets.append(len(self.rows))
+        if self.steps % self.checkpointInterval == 0:
+            self.checkpoints[self.steps] = array('q', self.current)
+
+    def replay(self, upTo=None):
+        # State after the first upTo steps, as a list of rows
+        upTo = self.steps if upTo is None else upTo
+        if not 0 <= upTo <= self.steps:
+            raise ValueError(f"upTo must be between 0 and {self.steps}")
+        base = upTo - upTo % self.checkpointInterval
+        state = array('q', self.checkpoints[base])
+        rows, columns, deltas, width = self.rows, self.columns, self.deltas, self.width
+        for i in range(self.stepOffsets[base], self.stepOffsets[upTo]):
+            state[rows[i] * width + columns[i]] += deltas[i]
+        return [state[row * width:(row + 1) * width].tolist() for row in range(self.numRows)]
+
+    def stepChanges(self, step):
+        # The (row, column, delta) changes made by a single step, 1-based like replay
+        if not 1 <= step <= self.steps:
+            raise ValueError(f"step must be between 1 and {self.steps}")
+        span = range(self.stepOffsets[step - 1], self.stepOffsets[step])
+        return [(self.rows[i], self.columns[i], self.deltas[i]) for i in span]
@@ -0,0 +1,87 @@
+import struct
+import sys
+from array import array
+
+# magic, version, kind, hashing, counter bytes, depth, width, first seed, seed count
+HEADER = struct.Struct("<4sBBBBIIII")
+MAGIC = b"SKCH"
+VERSION = 1
+KINDS = {"cms": 1, "sbf": 2}
+HASHINGS = {"seeded": 1, "double": 2}
+TYPECODES = {1: "B", 2: "H", 4: "I", 8: "Q"}
+
+def _seedRange(seeds):
+    # Seeds are always a contiguous range starting at seeds[0]
+    if list(seeds) != list(range(seeds[0], seeds[0] + len(seeds))):
+        raise ValueError("Only contiguous seed ranges can be serialized")
+    return seeds[0], len(seeds)
+
+def checkMergeable(sketch, other):
+    if type(other).sketchKind != type(sketch).sketchKind:
+        raise ValueError(f"Cannot merge {type(other).__name__} into {type(sketch).__name__}")
+    for attr in ("numHashFuncs", "width", "seeds"):
+        if getattr(sketch, attr) != getattr(other, attr):
+            raise ValueError(f"Cannot merge sketches with different {attr}: {getattr(sketch, attr)} != {getattr(other, attr)}")
+    if sketch.hasher.name != other.hasher.name:
+        raise ValueError(f"Cannot merge sketches with different hashing: {sketch.hasher.name} != {other.hasher.name}")
+
+def mergeCounters(other):
+    # The counters to add in: a shared sketch's filter is only its own lane, so take the lane sum
+    return other.total() if hasattr(other, "shared") else other.filter
+
+def encodeCounters(counters):
+    # Pick the narrowest unsigned width that holds the largest counter
+    isArray = hasattr(counters, "dtype")
+    maxValue = int(counters.max()) if isArray and counters.size else max(counters, default=0)
+    if maxValue >= 1 << 64:
+        raise ValueError("Counters larger than 64 bits cannot be serialized")
+    counterBytes = next(size for size in TYPECODES if maxValue < 1 << (8 * size))
+    if isArray:
+        return counterBytes, counters.astype(f"<u{counterBytes}").tobytes()
+    packed = array(TYPECODES[counterBytes], counters)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return counterBytes, packed.tobytes()
+
+def packSketch(sketch, counters):
+    counterBytes, payload = encodeCounters(counters)
+    firstSeed, seedCount = _seedRange(sketch.seeds)
+    header = HEADER.pack(MAGIC, VERSION, KINDS[sketch.sketchKind], HASHINGS[sketch.hasher.name],
+                         counterBytes, sketch.numHashFuncs, sketch.width, firstSeed, seedCount)
+    return header + payload
+
+def unpackSketch(data, sketchKind):
+    if len(data) < HEADER.size:
+        raise ValueError("Data is too short to contain a sketch header")
+    magic, version, kind, hashing, counterBytes, numHashFuncs, width, firstSeed, seedCount = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a serialized sketch or unsupported version")
+    if kind != KINDS[sketchKind]:
+        raise ValueError(f"Serialized sketch is not a {sketchKind} sketch")
+    if counterBytes not in TYPECODES:
+        raise ValueError(f"Unsupported counter width: {counterBytes} bytes")
+    hashings = {v: k for k, v in HASHINGS.items()}
+    if hashing not in hashings:
+        raise ValueError(f"Unknown hashing id: {hashing}")
+    header = {
+        "hashing": hashings[hashing],
+        "counterBytes": counterBytes,
+        "numHashFuncs": numHashFuncs,
+        "width": width,
+        "seeds": list(range(firstSeed, firstSeed + seedCount)),
+    }
+    payload = memoryview(data)[HEADER.size:]
+    if len(payload) != counterBytes * width * (numHashFuncs if sketchKind == "cms" else 1):
+        raise ValueError("Counter payload does not match the header dimensions")
+    return header, payload
+
+def decodeCounters(header, payload):
+    counters = array(TYPECODES[header["counterBytes"]])
+    counters.frombytes(payload)
+    if sys.byteorder == "big":
+        counters.byteswap()
+    return counters.tolist()
+
+def checkSeeds(sketch, header):
+    if sketch.seeds != header["seeds"]:
+        raise ValueError(f"Serialized seeds {header['seeds']} do not match {sketch.seeds}")
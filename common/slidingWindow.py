@@ -0,0 +1,59 @@
+import time
+import numpy as np
+
+class SketchRing:
+    # Ring of numSlots sub-sketch counter blocks sharing one preallocated array.
+    # The live window is every slot in the ring; rotating zeroes the oldest slot
+    # in place and makes it current, so old traffic drops out one slot at a time.
+    def __init__(self, numSlots, shape, eventsPerSlot=None, slotDuration=None, clock=time.monotonic, dtype=np.uint64):
+        if (eventsPerSlot is None) == (slotDuration is None):
+            raise ValueError("Exactly one of eventsPerSlot or slotDuration must be set")
+        if numSlots < 1:
+            raise ValueError("numSlots must be at least 1")
+        self.numSlots = numSlots
+        self.eventsPerSlot = eventsPerSlot
+        self.slotDuration = slotDuration
+        self.clock = clock
+        self.slots = np.zeros((numSlots,) + tuple(shape), dtype=dtype)
+        self.current = 0
+        self.eventsInSlot = 0
+        # Set by the first timestamp seen, so caller timestamps may use any timebase
+        self.slotStart = None
+        self.callerTimestamps = None
+
+    def rotate(self):
+        self.current = (self.current + 1) % self.numSlots
+        self.slots[self.current] = 0
+        self.eventsInSlot = 0
+
+    def advance(self, timestamp=None):
+        # Expire slots whose time is up; count based rings rotate in roomFor()
+        if self.slotDuration is None:
+            return
+        if self.callerTimestamps is None:
+            self.callerTimestamps = timestamp is not None
+        elif self.callerTimestamps != (timestamp is not None):
+            raise ValueError("Pass a timestamp on every call or on none, the clock and caller timestamps do not mix")
+        timestamp = self.clock() if timestamp is None else timestamp
+        if self.slotStart is None:
+            self.slotStart = timestamp
+            return
+        elapsed = int((timestamp - self.slotStart) // self.slotDuration)
+        if elapsed <= 0:
+            return
+        for _ in range(min(elapsed, self.numSlots)):
+            self.rotate()
+        self.slotStart += elapsed * self.slotDuration
+
+    def roomFor(self, events, timestamp=None):
+        # How many of the next events fit in the current slot, rotating first if it is full
+        self.advance(timestamp)
+        if self.eventsPerSlot is None:
+            return events
+        if self.eventsInSlot >= self.eventsPerSlot:
+            self.rotate()
+        return min(events, self.eventsPerSlot - self.eventsInSlot)
+
+    @property
+    def currentSlot(self):
+        return self.slots[self.current]
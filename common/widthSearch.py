@@ -0,0 +1,86 @@
+import numpy as np
+
+def findKnee(points):
+    # The (width, value) point farthest from the chord between the first and last point,
+    # i.e. where adding width stops paying off
+    if len(points) < 3:
+        return None
+    widths = np.array([width for width, _ in points], dtype=float)
+    values = np.array([value for _, value in points], dtype=float)
+    x = (widths - widths[0]) / (widths[-1] - widths[0])
+    y = (values - values.min()) / (np.ptp(values) or 1.0)
+    dx, dy = x[-1] - x[0], y[-1] - y[0]
+    distance = np.abs(dy * x - dx * y + x[-1] * y[0] - y[-1] * x[0]) / np.hypot(dx, dy)
+    return points[int(distance.argmax())]
+
+def searchMinimalWidth(evaluate, target, minWidth, maxWidth, tolerance=1, refineKnee=False, kneeSamples=4,
+                       widthsPerRound=1):
+    # Smallest width whose metric is at most target. evaluate(widths) returns {width: metric}
+    # for a batch of widths. Galloping doubles the width until the target is met, then
+    # bisection narrows the gap down to tolerance. With widthsPerRound > 1 each round tries
+    # that many doublings or split points in one batch, for sketches that build several widths
+    # in one pass. Sketch error only shrinks with width on average, so the result is the first
+    # passing width along the search path, not a global minimum.
+    if minWidth < 1 or maxWidth < minWidth:
+        raise ValueError(f"Invalid width range: {minWidth}..{maxWidth}")
+    if tolerance < 1:
+        raise ValueError(f"tolerance must be at least 1 width, got {tolerance}")
+    if widthsPerRound < 1:
+        raise ValueError(f"widthsPerRound must be at least 1, got {widthsPerRound}")
+    evaluated = {}
+
+    def measure(widths):
+        pending = [width for width in dict.fromkeys(widths) if width not in evaluated]
+        if pending:
+            evaluated.update(evaluate(pending))
+        return [evaluated[width] for width in widths]
+
+    def firstPassing(widths):
+        for width, value in zip(widths, measure(widths)):
+            if value <= target:
+                return width
+        return None
+
+    low, high = None, None
+    candidate = minWidth
+    while high is None:
+        widths = []
+        while len(widths) < widthsPerRound and (not widths or widths[-1] < maxWidth):
+            widths.append(candidate)
+            candidate = min(candidate * 2, maxWidth)
+        high = firstPassing(widths)
+        failed = widths if high is None else widths[:widths.index(high)]
+        low = failed[-1] if failed else low
+        if high is None and widths[-1] >= maxWidth:
+            break
+
+    if high is not None and low is not None:
+        while high - low > tolerance:
+            step = (high - low) / (widthsPerRound + 1)
+            widths = sorted({int(low + step * i) for i in range(1, widthsPerRound + 1)} - {low, high})
+            passing = firstPassing(widths)
+            if passing is None:
+                low = widths[-1]
+            else:
+                high = passing
+                low = max([width for width in widths if width < passing], default=low)
+
+    knee = None
+    if refineKnee:
+        points = sorted(evaluated.items())
+        knee = findKnee(points)
+        if knee is not None:
+            # Sample between the knee's neighbours, then locate it again on the denser curve
+            i = points.index(knee)
+            left, right = points[max(i - 1, 0)][0], points[min(i + 1, len(points) - 1)][0]
+            samples = np.unique(np.linspace(left, right, kneeSamples + 2).round().astype(int)).tolist()
+            measure(samples)
+            knee = findKnee(sorted(evaluated.items()))
+
+    return {
+        "target": target,
+        "width": high,
+        "value": evaluated[high] if high is not None else None,
+        "knee": knee[0] if knee is not None else None,
+        "evaluated": [[width, value] for width, value in evaluated.items()],
+    }
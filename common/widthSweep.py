@@ -0,0 +1,55 @@
+import numpy as np
+from common.hashFunctions import makeHashing
+
+class WidthSweep:
+    # Hashes the input once, then derives sketches for any width from the cached hashes
+    def __init__(self, inputSet, numHashFuncs, hashing="seeded", maxCells=1 << 22):
+        self.numHashFuncs = numHashFuncs
+        self.keys = list(dict.fromkeys(inputSet))
+        index = {key: i for i, key in enumerate(self.keys)}
+        self.stream = np.fromiter((index[key] for key in inputSet), dtype=np.int64, count=len(inputSet))
+        self.counts = np.bincount(self.stream, minlength=len(self.keys))
+        self.hasher = makeHashing(hashing, numHashFuncs, 1)
+        self.rawHashes = self.hasher.getRawHashes(self.keys)
+        # Bounds the (k, keys, widths) position block and the (widths, width) states of the SBF sweep
+        self.maxCells = maxCells
+
+    def _estimates(self, estimates):
+        return dict(zip(self.keys, estimates.tolist()))
+
+    def countMinSketch(self, widths):
+        rows = np.arange(self.numHashFuncs)[:, None]
+        for width in widths:
+            positions = self.hasher.positionsFromRaw(self.rawHashes, width)
+            state = np.zeros((self.numHashFuncs, width), dtype=np.int64)
+            np.add.at(state, (rows, positions), self.counts)
+            yield width, state, self._estimates(state[rows, positions].min(axis=0))
+
+    def spectralBloomFilter(self, widths):
+        # The minimum-increase update depends on insertion order, so the stream is
+        # replayed once per batch of widths with every width updated in lockstep.
+        # A batch stays within maxCells for both the position block and the states.
+        positionBatch = max(1, self.maxCells // max(1, self.numHashFuncs * len(self.keys)))
+        batch = []
+        for width in widths:
+            if batch and (len(batch) >= positionBatch or (len(batch) + 1) * max(max(batch), width) > self.maxCells):
+                yield from self._spectralBloomFilterBatch(batch)
+                batch = []
+            batch.append(width)
+        if batch:
+            yield from self._spectralBloomFilterBatch(batch)
+
+    def _spectralBloomFilterBatch(self, batch):
+        positions = np.stack([self.hasher.positionsFromRaw(self.rawHashes, width) for width in batch], axis=-1)
+        states = np.zeros((len(batch), max(batch)), dtype=np.int64)
+        columns = np.arange(len(batch))
+        for key in self.stream:
+            keyPositions = positions[:, key, :]
+            values = states[columns, keyPositions]
+            minValues = values.min(axis=0)
+            hit = values == minValues
+            # Repeated positions are assigned, not added, so each cell grows by at most one
+            states[np.broadcast_to(columns, hit.shape)[hit], keyPositions[hit]] = np.broadcast_to(minValues + 1, hit.shape)[hit]
+        estimates = states[columns, positions].min(axis=0)
+        for i, width in enumerate(batch):
+            yield width, states[i, :width].copy(), self._estimates(estimates[:, i])
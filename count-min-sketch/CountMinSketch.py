@@ -1,20 +1,118 @@
-import mmh3
+from common.hashFunctions import getIPv4BatchPositions, makeHashing
+from common.sketchJournal import SketchJournal
+from common.sketchSerialization import checkMergeable, checkSeeds, decodeCounters, mergeCounters, packSketch, unpackSketch
 
 class CountMinSketch:
-    def __init__(self, numHashFuncs, width):
+    sketchKind = "cms"
+
+    def __init__(self, numHashFuncs, width, hashing="seeded", cacheSize=0, conservative=False):
         self.numHashFuncs = numHashFuncs
         self.width = width
-        self.seeds = list(range(1, self.numHashFuncs + 1))
+        self.hasher = makeHashing(hashing, self.numHashFuncs, self.width, cacheSize)
+        self.seeds = self.hasher.seeds
+        # Conservative update raises each row only as far as the new estimate, like the SBF
+        self.conservative = conservative
         self.filter = [[0] * self.width for _ in range(self.numHashFuncs)]
+        self.journal = None
+        self.stats = None
 
     def _getElementPositions(self, elem):
-        return [mmh3.hash(elem, seed) % self.width for seed in self.seeds]
+        return self.hasher.getPositions(elem)
 
     def insertElem(self, elem):
         positions = self._getElementPositions(elem)
+        if self.conservative:
+            self._insertConservative(elem, positions)
+            return
         for i, pos in enumerate(positions):
             self.filter[i][pos] += 1
+        if self.journal is not None:
+            self.journal.record((i, pos, 1) for i, pos in enumerate(positions))
+        if self.stats is not None:
+            self.stats.recordInsert(elem, enumerate(positions), self.numHashFuncs)
+
+    def _insertConservative(self, elem, positions):
+        target = min(self.filter[i][pos] for i, pos in enumerate(positions)) + 1
+        changes = []
+        for i, pos in enumerate(positions):
+            value = self.filter[i][pos]
+            if value < target:
+                self.filter[i][pos] = target
+                changes.append((i, pos, target - value))
+        if self.journal is not None:
+            self.journal.record(changes)
+        if self.stats is not None:
+            self.stats.recordInsert(elem, enumerate(positions), len(changes))
 
     def getFrequency(self, elem):
         positions = self._getElementPositions(elem)
-        return min(self.filter[i][pos] for i, pos in enumerate(positions))
\ No newline at end of file
+        if self.stats is not None:
+            self.stats.recordQuery()
+        return min(self.filter[i][pos] for i, pos in enumerate(positions))
+
+    def insertIPv4Array(self, addresses):
+        # Integer-key fast path: same counters as inserting the dotted-quad strings
+        if self.journal is not None or self.stats is not None:
+            from common.ipv4Utils import ipv4ToStrings
+            for ip in ipv4ToStrings(addresses):
+                self.insertElem(ip)
+            return
+        positions, _, counts = getIPv4BatchPositions(self.hasher, addresses)
+        counts = counts.tolist()
+        positions = positions.tolist()
+        if self.conservative:
+            # Batched conservative update: every distinct key is raised to its estimate before
+            # the batch plus its count in the batch. Never under-counts, and never exceeds the
+            # plain update, but may differ slightly from inserting one by one.
+            targets = [min(row[pos] for row, pos in zip(self.filter, keyPositions)) + count
+                       for keyPositions, count in zip(zip(*positions), counts)]
+            for row, rowPositions in zip(self.filter, positions):
+                for pos, target in zip(rowPositions, targets):
+                    if row[pos] < target:
+                        row[pos] = target
+            return
+        for row, rowPositions in zip(self.filter, positions):
+            for pos, count in zip(rowPositions, counts):
+                row[pos] += count
+
+    def enableStats(self):
+        # Opt-in hot-path counters, see common.instrumentation
+        from common.instrumentation import SketchStats
+        self.stats = SketchStats()
+        self.hasher.instrument(self.stats)
+        return self.stats
+
+    def enableJournal(self, checkpointInterval=1000):
+        # Opt-in per-insert change log, see common.sketchJournal
+        self.journal = SketchJournal(self.numHashFuncs, self.width, checkpointInterval,
+                                     [int(value) for row in self.filter for value in row])
+        return self.journal
+
+    def replay(self, upTo=None):
+        if self.journal is None:
+            raise ValueError("Journal is not enabled, call enableJournal() first")
+        return self.journal.replay(upTo)
+
+    def merge(self, other):
+        checkMergeable(self, other)
+        changes = []
+        for i, (row, otherRow) in enumerate(zip(self.filter, mergeCounters(other))):
+            for pos, value in enumerate(otherRow):
+                row[pos] += int(value)
+                if value:
+                    changes.append((i, pos, int(value)))
+        if self.journal is not None:
+            self.journal.record(changes)
+        return self
+
+    def to_bytes(self):
+        return packSketch(self, [value for row in self.filter for value in row])
+
+    @classmethod
+    def from_bytes(cls, data, conservative=False):
+        header, payload = unpackSketch(data, cls.sketchKind)
+        sketch = cls(header["numHashFuncs"], header["width"], header["hashing"], conservative=conservative)
+        checkSeeds(sketch, header)
+        counters = decodeCounters(header, payload)
+        sketch.filter = [counters[i * sketch.width:(i + 1) * sketch.width] for i in range(sketch.numHashFuncs)]
+        return sketch
\ No newline at end of file
@@ -0,0 +1,72 @@
+import heapq
+from operator import itemgetter
+from .CountMinSketch import CountMinSketch
+
+class HeavyHitters:
+    # Top-k candidates on top of a CountMinSketch, memory is O(capacity) no matter
+    # how many distinct keys the stream has
+    def __init__(self, numHashFuncs, width, capacity=100, hashing="seeded", cacheSize=1024, conservative=False,
+                 sketch=None):
+        # The position cache makes the estimate right after each insert a cache hit.
+        # Any sketch whose estimates only grow can be wrapped instead, e.g. a SpectralBloomFilter.
+        if capacity < 1:
+            raise ValueError(f"capacity must be at least 1, got {capacity}")
+        self.sketch = sketch if sketch is not None else CountMinSketch(numHashFuncs, width, hashing, cacheSize, conservative)
+        self.capacity = capacity
+        self.candidates = {}
+        # Min-heap of (estimate, key), one entry per candidate. Estimates only grow,
+        # so an entry can be stale only by being too small; it is refreshed when it reaches the top.
+        self.heap = []
+
+    def _popStale(self):
+        while self.heap:
+            estimate, key = self.heap[0]
+            current = self.candidates[key]
+            if estimate == current:
+                return
+            heapq.heapreplace(self.heap, (current, key))
+
+    def insertElem(self, elem):
+        self.sketch.insertElem(elem)
+        self._offer(elem, self.sketch.getFrequency(elem))
+
+    def insertMany(self, elems):
+        # Batched sketches take the whole batch, then each distinct key is offered once
+        elems = list(elems)
+        if hasattr(self.sketch, "insertMany"):
+            self.sketch.insertMany(elems)
+        else:
+            for elem in elems:
+                self.sketch.insertElem(elem)
+        distinct = list(dict.fromkeys(elems))
+        if hasattr(self.sketch, "queryMany"):
+            estimates = self.sketch.queryMany(distinct).tolist()
+        else:
+            estimates = [self.sketch.getFrequency(elem) for elem in distinct]
+        for elem, estimate in zip(distinct, estimates):
+            self._offer(elem, estimate)
+
+    def _offer(self, elem, estimate):
+        if elem in self.candidates:
+            self.candidates[elem] = estimate
+        elif len(self.candidates) < self.capacity:
+            self.candidates[elem] = estimate
+            heapq.heappush(self.heap, (estimate, elem))
+        else:
+            self._popStale()
+            if estimate > self.heap[0][0]:
+                _, evicted = heapq.heapreplace(self.heap, (estimate, elem))
+                del self.candidates[evicted]
+                self.candidates[elem] = estimate
+
+    def reseed(self, keys):
+        # Offers keys again at their current estimates, e.g. the candidates saved with a snapshot
+        for key in keys:
+            self._offer(key, self.sketch.getFrequency(key))
+
+    def getFrequency(self, elem):
+        return self.sketch.getFrequency(elem)
+
+    def topK(self, k):
+        # (key, estimate) pairs, largest first. Scans every candidate, O(capacity log k)
+        return heapq.nlargest(k, self.candidates.items(), key=itemgetter(1))
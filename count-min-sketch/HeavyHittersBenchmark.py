@@ -0,0 +1,58 @@
+import time
+from .HeavyHitters import HeavyHitters
+from common.IPV4ExperimentData import NumpyExperimentData
+
+class HeavyHittersBenchmark:
+    def __init__(self, experimentData, numHashFuncs=4, width=2000, capacity=100, topK=10):
+        self.data = experimentData
+        self.numHashFuncs = numHashFuncs
+        self.width = width
+        self.capacity = capacity
+        self.topK = topK
+
+    def _runExact(self, inputSet):
+        # Baseline: one dict update per key of the same stream, keeping every distinct key
+        start = time.perf_counter()
+        actualCounts = {}
+        for ip in inputSet:
+            actualCounts[ip] = actualCounts.get(ip, 0) + 1
+        elapsed = time.perf_counter() - start
+        return actualCounts, elapsed
+
+    def _runHeavyHitters(self, inputSet):
+        hh = HeavyHitters(self.numHashFuncs, self.width, self.capacity)
+        start = time.perf_counter()
+        for ip in inputSet:
+            hh.insertElem(ip)
+        elapsed = time.perf_counter() - start
+        return hh, elapsed
+
+    def run(self):
+        inputSet = self.data.inputSet
+        actualCounts, exactTime = self._runExact(inputSet)
+        hh, hhTime = self._runHeavyHitters(inputSet)
+
+        exactTop = {key for key, _ in sorted(actualCounts.items(), key=lambda item: item[1], reverse=True)[:self.topK]}
+        hhTop = hh.topK(self.topK)
+        recall = len(exactTop & {key for key, _ in hhTop}) / len(exactTop)
+        meanError = sum((estimate - actualCounts[key]) / actualCounts[key] for key, estimate in hhTop) / len(hhTop)
+
+        result = {
+            "inputSetSize": len(inputSet),
+            "exactItemsPerSec": len(inputSet) / exactTime,
+            "heavyHittersItemsPerSec": len(inputSet) / hhTime,
+            "exactKeysStored": len(actualCounts),
+            "heavyHittersKeysStored": len(hh.candidates),
+            f"recall@{self.topK}": recall,
+            "meanRelativeError": meanError,
+        }
+        for key, value in result.items():
+            print(f"  {key}: {value:.4f}" if isinstance(value, float) else f"  {key}: {value}")
+        return result
+
+if __name__ == "__main__":
+
+    for distribution, alpha in (("zipf", 1.1), ("zipf", 1.5)):
+        print(f"Heavy Hitters: {distribution} Distribution (alpha={alpha})")
+        exp_data = NumpyExperimentData(dataSetSize=100000, inputSetSize=1000000, distribution=distribution, alpha=alpha, seed=0)
+        HeavyHittersBenchmark(exp_data).run()
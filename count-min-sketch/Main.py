@@ -1,64 +1,75 @@
-import cv2
+import json
 import os
 import shutil
-import sys
-from faker import Faker
-import random
-import pandas as pd
-import matplotlib.pyplot as plt
 from pathlib import Path
-import numpy as np
-from tqdm import tqdm
-import seaborn as sns
-from .CountMinSketch import CountMinSketch
 from common.IPV4ExperimentData import ExperimentData
+from common.instrumentation import Instrumentation, PhaseTimer
+from common.parallel import mapInOrder
+from common.resultsStore import ResultsStore, saveMetrics
+from common.widthSearch import searchMinimalWidth
+from common.widthSweep import WidthSweep
 
 class Main:
     def __init__(self, experimentData, numHashFuncs=3, 
                  minWidth=5, maxWidth=5000, iterationStepSize=25, 
-                 directoryPath="/tmp/output_cms"):
+                 directoryPath="/tmp/output_cms", workers=1,
+                 instrument=False, profile=False, plotIterations=None):
         
+        # Opt-in phase timing and profiling, written to instrumentation.json by run()
+        self.instrumentation = Instrumentation(instrument, profile)
+        self.instrument = self.instrumentation.enabled
+
         self.data = experimentData
-        self.actualCounts = self.data.get_actual_counts()
+        with self.instrumentation.phase("groundTruth"):
+            self.actualCounts = self.data.get_actual_counts()
         
         self.numHashFuncs = numHashFuncs
         self.widthRange = {"min": minWidth, "max": maxWidth, "step": iterationStepSize}
         self.directoryPath = directoryPath
+        self.workers = workers
+        # Charts and videos are optional: None skips them, "all" plots every width, or a list of widths
+        self.plotIterations = plotIterations
         
-        self.outputs = []
+        # Every width's estimates go into one table, metrics are computed once over all of them
+        self.results = ResultsStore("width")
+        self.metrics = None
+        self.searchResult = None
         self.filterStates = []
         
         if os.path.exists(self.directoryPath):
             shutil.rmtree(self.directoryPath)
         os.makedirs(self.directoryPath)
 
+    def __getstate__(self):
+        # Pool workers only need the configuration, not the data or accumulated results
+        state = self.__dict__.copy()
+        for key in ("data", "results", "filterStates", "instrumentation"):
+            state.pop(key, None)
+        return state
+
     def _runIterations(self):
-        for width in range(self.widthRange["min"], self.widthRange["max"], self.widthRange["step"]):
-            cms = CountMinSketch(self.numHashFuncs, width)
-            for ip in self.data.inputSet:
-                cms.insertElem(ip)
-            
-            estimates = {ip: cms.getFrequency(ip) for ip in set(self.data.inputSet)}
-            self.outputs.append({"width": width, "estimates": estimates})
-            self.filterStates.append({"width": width, "state": cms.filter})
+        # Same counters as building a CountMinSketch per width, but the input is hashed only once
+        with self.instrumentation.phase("hashing"):
+            sweep = WidthSweep(self.data.inputSet, self.numHashFuncs)
+        widths = range(self.widthRange["min"], self.widthRange["max"], self.widthRange["step"])
+        with self.instrumentation.phase("counterUpdates"):
+            for width, state, estimates in sweep.countMinSketch(widths):
+                self.results.add(width, self.actualCounts, estimates)
+                self.filterStates.append({"width": width, "state": state})
 
     def _saveOutputGraph(self, outputItem):
-        df = pd.DataFrame({
-            "actualCounts": pd.Series(self.actualCounts),
-            "estimatedCounts": pd.Series(outputItem["estimates"])
-        })
-        error = ((df["estimatedCounts"] - df["actualCounts"]) / df["actualCounts"]).mean()
-        
+        import matplotlib.pyplot as plt
         plt.figure(figsize=(12, 6))
-        df.plot(kind='bar', ax=plt.gca(), title=f"Width: {outputItem['width']}, Mean Error: {error:.4f}")
+        outputItem["frame"].plot(kind='bar', ax=plt.gca(), title=f"Width: {outputItem['width']}, Mean Error: {outputItem['meanRelativeError']:.4f}")
         
         savePath = Path(self.directoryPath) / str(outputItem["width"])
         savePath.mkdir(parents=True, exist_ok=True)
         plt.savefig(savePath / "actual_vs_estimate.png")
-        plt.close('all') 
-        return df
+        plt.close('all')
 
     def _saveFilterStateGraph(self, filterStateItem):
+        import matplotlib.pyplot as plt
+        import seaborn as sns
         plt.figure(figsize=(15, 4))
         sns.heatmap(filterStateItem["state"], cbar_kws={'orientation': 'horizontal'}, cmap='Wistia')
         plt.title(f"CMS State (Rows: {self.numHashFuncs}, Width: {filterStateItem['width']})")
@@ -68,43 +79,97 @@ class Main:
         plt.savefig(savePath / "filter_state.png", bbox_inches='tight')
         plt.close('all')
 
-    def _createVid(self, frameFileName, fps=5):
-        target_size = (1280, 720)
+    def _saveIteration(self, items):
+        # Timings come back to run() so they survive pool workers
+        filterStateItem, outputItem = items
+        timer = PhaseTimer(self.instrument)
+        with timer.phase("matplotlib"):
+            self._saveFilterStateGraph(filterStateItem)
+            self._saveOutputGraph(outputItem)
+        return timer.phases
+
+    def _createVid(self, frameFileName, widths, fps=5):
+        from common.miscFunctions import encodeVideo
         video_name = os.path.join(self.directoryPath, f'cms_{frameFileName.split(".")[0]}_video.mp4')
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(video_name, fourcc, fps, target_size)
+        paths = [os.path.join(self.directoryPath, str(width), frameFileName) for width in widths]
+        result = encodeVideo(paths, video_name, fps)
+        print(f"Video saved to: {video_name} ({result['frames']} frames, {result['framesPerSec']:.1f} frames/s)")
 
-        for op in self.outputs:
-            path = os.path.join(self.directoryPath, str(op["width"]), frameFileName)
-            img = cv2.imread(path)
-            if img is not None:
-                img = cv2.resize(img, target_size)
-                out.write(img)
-        out.release()
-        print(f"Video saved to: {video_name}")
+    def plot(self, iterations="all"):
+        # On-demand charts and videos for the chosen widths, read back from the results table
+        widths = set(self.results.parameterValues().tolist() if iterations == "all" else iterations)
+        filterStates = sorted((item for item in self.filterStates if item["width"] in widths), key=lambda item: item["width"])
+        errors = dict(zip(self.metrics["width"].tolist(), self.metrics["meanRelativeError"].tolist()))
+        with self.instrumentation.phase("pandas"):
+            outputs = [{"width": item["width"], "frame": self.results.frame(item["width"]),
+                        "meanRelativeError": errors[item["width"]]} for item in filterStates]
+        
+        for phases in mapInOrder(self._saveIteration, zip(filterStates, outputs), self.workers, desc="Saving Iterations"):
+            self.instrumentation.timer.merge(phases)
+            
+        with self.instrumentation.phase("video"):
+            self._createVid("filter_state.png", [item["width"] for item in filterStates])
+            self._createVid("actual_vs_estimate.png", [item["width"] for item in filterStates])
+
+    def _saveResults(self):
+        with self.instrumentation.phase("metrics"):
+            self.metrics = self.results.metrics()
+        with self.instrumentation.phase("results"):
+            print(f"Results saved to: {self.results.save(self.directoryPath)}")
+            saveMetrics(self.metrics, self.directoryPath)
+        if self.plotIterations is not None:
+            self.plot(self.plotIterations)
+        self.instrumentation.stop()
+        self.instrumentation.save(self.directoryPath)
 
     def run(self):
         print(f"Running CMS Iterations... (Output: {self.directoryPath})")
+        self.instrumentation.start()
         self._runIterations()
-        
-        for item in tqdm(self.filterStates, desc="Saving Filter States"):
-            self._saveFilterStateGraph(item)
-        
-        for item in tqdm(self.outputs, desc="Saving Estimates"):
-            df = self._saveOutputGraph(item)
-            df.to_csv(Path(self.directoryPath) / str(item["width"]) / "output.csv")
-            
-        self._createVid("filter_state.png")
-        self._createVid("actual_vs_estimate.png")
+        self._saveResults()
+
+    def search(self, targetError, metric="meanRelativeError", tolerance=1, refineKnee=False, widthsPerRound=1):
+        # Adaptive alternative to run(): finds the smallest width in [minWidth, maxWidth] whose
+        # metric (any column of metrics.csv) is at most targetError, building only a handful of widths
+        print(f"Searching CMS width for {metric} <= {targetError}... (Output: {self.directoryPath})")
+        self.instrumentation.start()
+        with self.instrumentation.phase("hashing"):
+            sweep = WidthSweep(self.data.inputSet, self.numHashFuncs)
+
+        def evaluate(widths):
+            with self.instrumentation.phase("counterUpdates"):
+                for width, state, estimates in sweep.countMinSketch(widths):
+                    self.results.add(width, self.actualCounts, estimates)
+                    self.filterStates.append({"width": width, "state": state})
+            metrics = self.results.metrics()
+            if metric not in metrics:
+                raise ValueError(f"Unknown metric {metric}, expected one of {sorted(metrics)}")
+            values = dict(zip(metrics["width"].tolist(), metrics[metric].tolist()))
+            return {width: values[width] for width in widths}
+
+        self.searchResult = searchMinimalWidth(evaluate, targetError, self.widthRange["min"], self.widthRange["max"],
+                                               tolerance, refineKnee, widthsPerRound=widthsPerRound)
+        self.searchResult["metric"] = metric
+        for width, value in self.searchResult["evaluated"]:
+            print(f"  width {width:>6}: {metric} {value:.4f}")
+        if self.searchResult["width"] is None:
+            print(f"No width up to {self.widthRange['max']} meets the target")
+        else:
+            print(f"Minimal width: {self.searchResult['width']} after {len(self.searchResult['evaluated'])} builds"
+                  + (f", knee at {self.searchResult['knee']}" if self.searchResult["knee"] is not None else ""))
+        with open(Path(self.directoryPath) / "search.json", "w") as f:
+            json.dump(self.searchResult, f, indent=2)
+        self._saveResults()
+        return self.searchResult
 
 if __name__ == "__main__":
     
     print("Count-Min Sketch: zipf Distribution")
     exp_data = ExperimentData(dataSetSize=100, inputSetSize=500, distribution='zipf')
-    m = Main(exp_data, directoryPath="/tmp/output_cms_zipf")
+    m = Main(exp_data, directoryPath="/tmp/output_cms_zipf", plotIterations="all")
     m.run()
     
     print("Count-Min Sketch: random Distribution")
     exp_data = ExperimentData(dataSetSize=100, inputSetSize=500, distribution='random')
-    m = Main(exp_data, directoryPath="/tmp/output_cms_random")
+    m = Main(exp_data, directoryPath="/tmp/output_cms_random", plotIterations="all")
     m.run()
\ No newline at end of file
@@ -0,0 +1,143 @@
+from collections import Counter
+import numpy as np
+from .CountMinSketch import CountMinSketch
+from common.hashFunctions import getIPv4BatchPositions
+from common.sketchSerialization import checkMergeable, checkSeeds, mergeCounters, packSketch, unpackSketch
+
+class NumpyCountMinSketch(CountMinSketch):
+    def __init__(self, numHashFuncs, width, hashing="seeded", cacheSize=0, dtype=np.uint64, conservative=False):
+        super().__init__(numHashFuncs, width, hashing, cacheSize, conservative)
+        # Contiguous (depth, width) counters instead of a list of lists
+        self.filter = np.zeros((self.numHashFuncs, self.width), dtype=dtype)
+        # Counters saturate at counterMax instead of wrapping, like the fixed-width SBF counters
+        self.counterMax = int(np.iinfo(dtype).max)
+        self._rows = np.arange(self.numHashFuncs)[:, None]
+
+    def _getBatchPositions(self, elems):
+        # One row of positions per hash function, one column per element
+        return self.hasher.getBatchPositions(elems)
+
+    def insertElem(self, elem):
+        positions = self._getElementPositions(elem)
+        if self.conservative:
+            self._insertConservative(elem, positions)
+            return
+        current = self.filter[self._rows[:, 0], positions]
+        raised = current < self.counterMax
+        self.filter[self._rows[:, 0], positions] = current + raised
+        if self.journal is not None:
+            self.journal.record((i, pos, 1) for i, pos in enumerate(positions) if raised[i])
+        if self.stats is not None:
+            self.stats.saturated += self.numHashFuncs - int(raised.sum())
+            self.stats.recordInsert(elem, enumerate(positions), int(raised.sum()))
+
+    def _insertConservative(self, elem, positions):
+        current = self.filter[self._rows[:, 0], positions]
+        target = int(current.min()) + 1
+        if target > self.counterMax:
+            # Every minimum is already at the cap, so estimates for this key stop growing
+            if self.stats is not None:
+                self.stats.saturated += int((current == self.counterMax).sum())
+                self.stats.recordInsert(elem, enumerate(positions), 0)
+            if self.journal is not None:
+                # An empty step keeps journal steps aligned with inserts
+                self.journal.record(())
+            return
+        raised = current < target
+        rows, columns = self._rows[raised, 0], np.asarray(positions)[raised]
+        self.filter[rows, columns] = target
+        if self.journal is not None:
+            self.journal.record(zip(rows.tolist(), columns.tolist(), (target - current[raised]).tolist()))
+        if self.stats is not None:
+            self.stats.recordInsert(elem, enumerate(positions), int(raised.sum()))
+
+    def _addCounts(self, positions, counts):
+        # counts are int64. Counters narrower than 64 bits are summed at 64 bits and capped at
+        # counterMax; 64-bit counters are added directly.
+        narrow = self.filter.dtype.itemsize < 8
+        if self.conservative:
+            # Batched conservative update: each distinct key is raised to its estimate before the
+            # batch plus its count. Never under-counts and never exceeds the plain update, but the
+            # counters may differ slightly from inserting one by one.
+            estimates = self.filter[self._rows, positions].min(axis=0)
+            if narrow:
+                targets = np.minimum(estimates + counts, self.counterMax).astype(self.filter.dtype)
+            else:
+                targets = estimates + counts.astype(self.filter.dtype)
+            np.maximum.at(self.filter, (self._rows, positions), targets)
+        elif not narrow:
+            np.add.at(self.filter, (self._rows, positions), counts.astype(self.filter.dtype))
+        else:
+            # Sum the counts per touched cell first, since several keys can share a cell
+            cells, inverse = np.unique((self._rows * self.width + positions).ravel(), return_inverse=True)
+            added = np.zeros(len(cells), dtype=np.int64)
+            np.add.at(added, inverse.ravel(), np.broadcast_to(counts, positions.shape).ravel())
+            counters = self.filter.reshape(-1)
+            counters[cells] = np.minimum(counters[cells] + added, self.counterMax)
+
+    def getFrequency(self, elem):
+        positions = self._getElementPositions(elem)
+        if self.stats is not None:
+            self.stats.recordQuery()
+        return int(self.filter[self._rows[:, 0], positions].min())
+
+    def insertMany(self, elems):
+        if self.journal is not None or self.stats is not None:
+            # The journal and stats need one step per insert
+            for elem in elems:
+                self.insertElem(elem)
+            return
+        # Hash every distinct key once and add its multiplicity in a single scatter
+        counts = Counter(elems)
+        if not counts:
+            return
+        positions = self._getBatchPositions(list(counts))
+        weights = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+        self._addCounts(positions, weights)
+
+    def queryMany(self, elems):
+        elems = list(elems)
+        distinct = list(dict.fromkeys(elems))
+        if not distinct:
+            return np.zeros(0, dtype=self.filter.dtype)
+        positions = self._getBatchPositions(distinct)
+        estimates = self.filter[self._rows, positions].min(axis=0)
+        index = {elem: i for i, elem in enumerate(distinct)}
+        return estimates[[index[elem] for elem in elems]]
+
+    def insertIPv4Array(self, addresses):
+        if self.journal is not None or self.stats is not None:
+            return super().insertIPv4Array(addresses)
+        positions, _, counts = getIPv4BatchPositions(self.hasher, addresses)
+        self._addCounts(positions, counts.astype(np.int64))
+
+    def queryIPv4Array(self, addresses):
+        positions, inverse, _ = getIPv4BatchPositions(self.hasher, addresses)
+        return self.filter[self._rows, positions].min(axis=0)[inverse]
+
+    def merge(self, other):
+        checkMergeable(self, other)
+        if self.filter.dtype.itemsize < 8:
+            # Capped at counterMax; the journal gets the increments actually applied
+            merged = np.minimum(self.filter + np.asarray(mergeCounters(other), dtype=np.int64), self.counterMax)
+            otherFilter = (merged - self.filter).astype(self.filter.dtype)
+            self.filter[:] = merged
+        else:
+            otherFilter = np.asarray(mergeCounters(other), dtype=self.filter.dtype)
+            self.filter += otherFilter
+        if self.journal is not None:
+            rows, columns = np.nonzero(otherFilter)
+            self.journal.record(zip(rows.tolist(), columns.tolist(), otherFilter[rows, columns].tolist()))
+        return self
+
+    def to_bytes(self):
+        return packSketch(self, self.filter.ravel())
+
+    @classmethod
+    def from_bytes(cls, data, conservative=False):
+        header, payload = unpackSketch(data, cls.sketchKind)
+        sketch = cls(header["numHashFuncs"], header["width"], header["hashing"], conservative=conservative)
+        checkSeeds(sketch, header)
+        counters = np.frombuffer(payload, dtype=f"<u{header['counterBytes']}")
+        sketch.filter[:] = counters.reshape(sketch.numHashFuncs, sketch.width)
+        return sketch
\ No newline at end of file
@@ -0,0 +1,60 @@
+import numpy as np
+from .NumpyCountMinSketch import NumpyCountMinSketch
+from common.hashFunctions import getIPv4BatchPositions
+from common.sharedCounters import SharedLanes, checkLane
+from common.sketchSerialization import packSketch
+
+class SharedCountMinSketch(NumpyCountMinSketch):
+    # Count-Min Sketch whose counters live in shared memory, with one (depth, width) lane per
+    # writer process. Inserts only touch this process's lane and queries sum every lane, so
+    # an estimate never under-counts inserts that returned before the query started. With
+    # the plain update, once all writers are done it equals the single-process sketch.
+    def __init__(self, numHashFuncs, width, hashing="seeded", cacheSize=0, conservative=False,
+                 numLanes=1, lane=0, name=None):
+        super().__init__(numHashFuncs, width, hashing, cacheSize, conservative=conservative)
+        checkLane(lane, numLanes)
+        self.shared = SharedLanes(numLanes, (self.numHashFuncs, self.width), name)
+        self.lane = lane
+        self.filter = self.shared.lane(lane)
+
+    def attach(self, lane):
+        # Same counters, writing to another lane
+        return type(self)(self.numHashFuncs, self.width, self.hasher.name, self.hasher.cacheSize, self.conservative,
+                          self.shared.numLanes, lane, self.shared.name)
+
+    def __reduce__(self):
+        # A copy would write to this process's lane. Other processes open the block by name
+        # with a lane of their own, or fork and call attach(lane)
+        raise TypeError(f"Cannot pickle a {type(self).__name__} bound to lane {self.lane}; "
+                        f"pass name={self.shared.name!r} and a lane to the constructor instead")
+
+    def total(self):
+        return self.shared.total()
+
+    def getFrequency(self, elem):
+        positions = self._getElementPositions(elem)
+        if self.stats is not None:
+            self.stats.recordQuery()
+        return int(self.shared.lanes[:, self._rows[:, 0], positions].sum(axis=0).min())
+
+    def queryMany(self, elems):
+        elems = list(elems)
+        distinct = list(dict.fromkeys(elems))
+        if not distinct:
+            return np.zeros(0, dtype=self.filter.dtype)
+        positions = self._getBatchPositions(distinct)
+        estimates = self.shared.lanes[:, self._rows, positions].sum(axis=0).min(axis=0)
+        index = {elem: i for i, elem in enumerate(distinct)}
+        return estimates[[index[elem] for elem in elems]]
+
+    def queryIPv4Array(self, addresses):
+        positions, inverse, _ = getIPv4BatchPositions(self.hasher, addresses)
+        return self.shared.lanes[:, self._rows, positions].sum(axis=0).min(axis=0)[inverse]
+
+    def to_bytes(self):
+        # The summed counters, so a snapshot loads as an ordinary sketch
+        return packSketch(self, self.total().ravel())
+
+    def close(self):
+        self.filter = None
+        self.shared.close()
@@ -0,0 +1,57 @@
+from collections import Counter
+import numpy as np
+from common.hashFunctions import makeHashing
+from common.slidingWindow import SketchRing
+
+class WindowedCountMinSketch:
+    # Count-Min Sketch over the last numSlots slots, each slot covering eventsPerSlot
+    # inserts or slotDuration seconds
+    def __init__(self, numHashFuncs, width, numSlots=5, eventsPerSlot=None, slotDuration=None,
+                 hashing="seeded", cacheSize=0, clock=None):
+        self.numHashFuncs = numHashFuncs
+        self.width = width
+        self.hasher = makeHashing(hashing, self.numHashFuncs, self.width, cacheSize)
+        self.seeds = self.hasher.seeds
+        ringArgs = {"clock": clock} if clock is not None else {}
+        self.ring = SketchRing(numSlots, (self.numHashFuncs, self.width), eventsPerSlot, slotDuration, **ringArgs)
+        self._rows = np.arange(self.numHashFuncs)
+
+    @property
+    def filter(self):
+        # Counters aggregated over the live window
+        return self.ring.slots.sum(axis=0)
+
+    def _getElementPositions(self, elem):
+        return self.hasher.getPositions(elem)
+
+    def insertElem(self, elem, timestamp=None):
+        self.ring.roomFor(1, timestamp)
+        self.ring.currentSlot[self._rows, self._getElementPositions(elem)] += 1
+        self.ring.eventsInSlot += 1
+
+    def getFrequency(self, elem, timestamp=None):
+        self.ring.advance(timestamp)
+        positions = self._getElementPositions(elem)
+        return int(self.ring.slots[:, self._rows, positions].sum(axis=0).min())
+
+    def insertMany(self, elems, timestamp=None):
+        elems = list(elems)
+        start = 0
+        while start < len(elems):
+            # Split the batch at slot boundaries so rotation stays exact
+            room = self.ring.roomFor(len(elems) - start, timestamp)
+            counts = Counter(elems[start:start + room])
+            positions = self.hasher.getBatchPositions(list(counts))
+            weights = np.fromiter(counts.values(), dtype=self.ring.slots.dtype, count=len(counts))
+            np.add.at(self.ring.currentSlot, (self._rows[:, None], positions), weights)
+            self.ring.eventsInSlot += room
+            start += room
+
+    def queryMany(self, elems, timestamp=None):
+        self.ring.advance(timestamp)
+        elems = list(elems)
+        if not elems:
+            return np.zeros(0, dtype=self.ring.slots.dtype)
+        positions = self.hasher.getBatchPositions(elems)
+        # (slots, depth, elems) gathered at once, summed over slots, min over rows
+        return self.ring.slots[:, self._rows[:, None], positions].sum(axis=0).min(axis=0)
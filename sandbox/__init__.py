@@ -0,0 +1,26 @@
+import importlib
+
+# The sketch core needs only mmh3 and numpy. Classes are imported on first use, so
+# `from sandbox import CountMinSketch` never loads the experiment or plotting layer.
+CORE = {
+    "CountMinSketch": "count-min-sketch.CountMinSketch",
+    "NumpyCountMinSketch": "count-min-sketch.NumpyCountMinSketch",
+    "HeavyHitters": "count-min-sketch.HeavyHitters",
+    "WindowedCountMinSketch": "count-min-sketch.WindowedCountMinSketch",
+    "SharedCountMinSketch": "count-min-sketch.SharedCountMinSketch",
+    "SpectralBloomFilter": "spectral-bloom-filter.SpectralBloomFilter",
+    "WindowedSpectralBloomFilter": "spectral-bloom-filter.WindowedSpectralBloomFilter",
+    "SharedSpectralBloomFilter": "spectral-bloom-filter.SharedSpectralBloomFilter",
+}
+
+__all__ = list(CORE)
+
+def __getattr__(name):
+    if name not in CORE:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(CORE[name]), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
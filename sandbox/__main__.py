@@ -0,0 +1,100 @@
+import argparse
+import importlib
+import sys
+
+PACKAGES = {"cms": "count-min-sketch", "sbf": "spectral-bloom-filter"}
+
+def loadDriver(sketch, name):
+    return getattr(importlib.import_module(f"{PACKAGES[sketch]}.{name}"), name)
+
+def given(args, **names):
+    # Only options set on the command line, so each driver keeps its own defaults
+    return {parameter: getattr(args, name) for parameter, name in names.items() if getattr(args, name) is not None}
+
+def widthSweep(args):
+    from common.IPV4ExperimentData import NumpyExperimentData
+    Main = loadDriver(args.sketch, "Main")
+    data = NumpyExperimentData(dataSetSize=args.data_set_size, inputSetSize=args.input_set_size,
+                               distribution=args.distribution, alpha=args.alpha, seed=args.seed)
+    main = Main(data, instrument=args.instrument, profile=args.profile, plotIterations="all" if args.plot else None,
+                **given(args, numHashFuncs="depth", minWidth="min_width", maxWidth="max_width",
+                        iterationStepSize="step", directoryPath="output", workers="workers"))
+    if args.target is None:
+        main.run()
+    else:
+        main.search(args.target, args.metric, args.tolerance, args.refine_knee,
+                    **given(args, widthsPerRound="widths_per_round"))
+    return 0
+
+def sizeSweep(args):
+    MainV2 = loadDriver(args.sketch, "MainV2")
+    main = MainV2(distribution=args.distribution, streamVideo=args.stream_video, maxChangeFramesOnly=args.max_change_only,
+                  instrument=args.instrument, profile=args.profile, plotIterations="all" if args.plot else None,
+                  journal=args.journal,
+                  **given(args, numHashFuncs="depth", width="width", minInputSetSize="min_size",
+                          maxInputSetSize="max_size", iterationStepSize="step", directoryPath="output",
+                          workers="workers", frameStride="frame_stride"))
+    main.run()
+    return 0
+
+def bench(args, rest):
+    # Everything after the subcommand goes to benchmarks.SketchBenchmark run, with every
+    # variant of the chosen sketch unless --sketches is given
+    from benchmarks import SketchBenchmark
+    sketches = [name for name in SketchBenchmark.SKETCHES if name.split("-")[0] == args.sketch]
+    return SketchBenchmark.main(["run", "--sketches", *sketches, *rest])
+
+def addCommonArguments(parser):
+    parser.add_argument("--depth", type=int, help="Number of hash functions")
+    parser.add_argument("--output", help="Output directory, cleared on start")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--plot", action="store_true", help="Write charts, per-insert frames and videos for every iteration")
+    parser.add_argument("--instrument", action="store_true")
+    parser.add_argument("--profile", action="store_true")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m sandbox", description="Experiments and benchmarks for the sketches")
+    parser.add_argument("sketch", choices=sorted(PACKAGES))
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    widthParser = commands.add_parser("width-sweep", help="Error against sketch width (Main)")
+    addCommonArguments(widthParser)
+    widthParser.add_argument("--min-width", type=int)
+    widthParser.add_argument("--max-width", type=int)
+    widthParser.add_argument("--step", type=int)
+    widthParser.add_argument("--distribution", default="zipf", choices=["zipf", "random"])
+    widthParser.add_argument("--alpha", type=float, default=1.2)
+    widthParser.add_argument("--data-set-size", type=int, default=100)
+    widthParser.add_argument("--input-set-size", type=int, default=500)
+    widthParser.add_argument("--seed", type=int)
+    widthParser.add_argument("--target", type=float, help="Search for the smallest width meeting this error instead of sweeping")
+    widthParser.add_argument("--metric", default="meanRelativeError")
+    widthParser.add_argument("--tolerance", type=int, default=1)
+    widthParser.add_argument("--refine-knee", action="store_true")
+    widthParser.add_argument("--widths-per-round", type=int)
+
+    sizeParser = commands.add_parser("size-sweep", help="Error against input size at a fixed width (MainV2)")
+    addCommonArguments(sizeParser)
+    sizeParser.add_argument("--width", type=int)
+    sizeParser.add_argument("--min-size", type=int)
+    sizeParser.add_argument("--max-size", type=int)
+    sizeParser.add_argument("--step", type=int)
+    sizeParser.add_argument("--distribution", default="random", choices=["zipf", "random"])
+    sizeParser.add_argument("--stream-video", action="store_true")
+    sizeParser.add_argument("--frame-stride", type=int)
+    sizeParser.add_argument("--max-change-only", action="store_true")
+    sizeParser.add_argument("--journal", action="store_true", help="Keep a change journal with each final state")
+
+    commands.add_parser("bench", help="Throughput and latency benchmark, extra options go to benchmarks.SketchBenchmark run")
+
+    args, rest = parser.parse_known_args(argv)
+    if args.command == "bench":
+        return bench(args, rest)
+    if rest:
+        parser.error(f"unrecognized arguments: {' '.join(rest)}")
+    if args.command == "width-sweep":
+        return widthSweep(args)
+    return sizeSweep(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+import argparse
+import asyncio
+import json
+import time
+from benchmarks.SketchBenchmark import parseDistribution, percentile
+from common.IPV4ExperimentData import NumpyExperimentData
+from common.ipv4Utils import ipv4ToBytes
+
+async def produce(host, port, keys, keysPerWrite):
+    # Streams keys as fast as the server lets it, then waits until all of them are counted
+    reader, writer = await asyncio.open_connection(host, port)
+    for start in range(0, len(keys), keysPerWrite):
+        writer.write(b"\n".join(keys[start:start + keysPerWrite]) + b"\n")
+        await writer.drain()
+    writer.write(b"!flush\n")
+    await writer.drain()
+    await reader.readline()
+    writer.close()
+    await writer.wait_closed()
+
+async def query(host, port, keys, done):
+    # Round-trip latency of point and top-k queries, sent one at a time while the producers run
+    reader, writer = await asyncio.open_connection(host, port)
+    pointLatencies, topLatencies = [], []
+    for i, key in enumerate(keys):
+        if done.is_set() and len(pointLatencies) >= len(keys) // 10:
+            break
+        request = b"!top 10\n" if i % 100 == 99 else b"?" + key + b"\n"
+        start = time.perf_counter_ns()
+        writer.write(request)
+        await writer.drain()
+        await reader.readline()
+        (topLatencies if i % 100 == 99 else pointLatencies).append(time.perf_counter_ns() - start)
+    writer.close()
+    await writer.wait_closed()
+    return sorted(pointLatencies), sorted(topLatencies)
+
+async def request(host, port, line):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(line + b"\n")
+    await writer.drain()
+    response = await reader.readline()
+    writer.close()
+    await writer.wait_closed()
+    return response
+
+async def run(args):
+    distribution, alpha = parseDistribution(args.distribution)
+    data = NumpyExperimentData(dataSetSize=args.data_set_size, inputSetSize=args.stream_size,
+                               distribution=distribution, alpha=alpha, seed=args.seed)
+    keys = ipv4ToBytes(data.inputArray)
+    queryKeys = ipv4ToBytes(data.dataArray[:args.queries])
+    shares = [keys[i::args.connections] for i in range(args.connections)]
+
+    done = asyncio.Event()
+    queries = asyncio.create_task(query(args.host, args.port, queryKeys, done))
+    start = time.perf_counter()
+    await asyncio.gather(*(produce(args.host, args.port, share, args.keys_per_write) for share in shares))
+    elapsed = time.perf_counter() - start
+    done.set()
+    pointLatencies, topLatencies = await queries
+
+    print(f"Ingested {len(keys):,} keys over {args.connections} connection(s) in {elapsed:.2f}s: "
+          f"{len(keys) / elapsed:,.0f} keys/s")
+    if pointLatencies:
+        print(f"Point queries under load: {len(pointLatencies)}, p50 {percentile(pointLatencies, 0.50) / 1000:.1f}us, "
+              f"p99 {percentile(pointLatencies, 0.99) / 1000:.1f}us")
+    if topLatencies:
+        print(f"Top-k queries under load: {len(topLatencies)}, p50 {percentile(topLatencies, 0.50) / 1000:.1f}us, "
+              f"p99 {percentile(topLatencies, 0.99) / 1000:.1f}us")
+
+    # Only meaningful against a server that started empty
+    actualCounts = data.get_actual_counts()
+    actualTop = sorted(actualCounts, key=actualCounts.get, reverse=True)[:10]
+    reportedTop = [key for key, _ in json.loads(await request(args.host, args.port, b"!top 10"))]
+    print(f"Top-10 recall: {len(set(actualTop) & set(reportedTop)) / len(actualTop):.2f}")
+    print(f"Server: {(await request(args.host, args.port, b'!stats')).decode().strip()}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load generator for sketch-service.SketchServer")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7070)
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--stream-size", type=int, default=1000000)
+    parser.add_argument("--data-set-size", type=int, default=10000)
+    parser.add_argument("--distribution", default="zipf:1.1")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--keys-per-write", type=int, default=4096)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(run(parser.parse_args(argv)))
+
+if __name__ == "__main__":
+    main()
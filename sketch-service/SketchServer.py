@@ -0,0 +1,249 @@
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import struct
+import sys
+from pathlib import Path
+
+HeavyHitters = importlib.import_module("count-min-sketch.HeavyHitters").HeavyHitters
+
+SKETCHES = {
+    # The NumPy sketch takes whole batches in one scatter; the SBF update is order dependent
+    "cms": ("count-min-sketch.NumpyCountMinSketch", "NumpyCountMinSketch"),
+    "sbf": ("spectral-bloom-filter.SpectralBloomFilter", "SpectralBloomFilter"),
+}
+
+# magic, length of the sketch bytes; followed by the sketch and a JSON list of candidate keys
+SNAPSHOT_HEADER = struct.Struct("<4sQ")
+SNAPSHOT_MAGIC = b"SKSV"
+
+def loadSketchClass(name):
+    module, cls = SKETCHES[name]
+    return getattr(importlib.import_module(module), cls)
+
+def packSnapshot(sketch, keys):
+    sketchBytes = sketch.to_bytes()
+    # latin-1 maps every byte to one code point, so any key survives the JSON round trip
+    candidates = json.dumps([key.decode("latin-1") for key in keys]).encode()
+    return SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, len(sketchBytes)) + sketchBytes + candidates
+
+def unpackSnapshot(data):
+    # (sketch bytes, candidate keys); a bare serialized sketch has no candidates
+    if data[:4] != SNAPSHOT_MAGIC:
+        return data, []
+    if len(data) < SNAPSHOT_HEADER.size:
+        raise ValueError("Snapshot is too short to contain a header")
+    _, length = SNAPSHOT_HEADER.unpack_from(data)
+    start = SNAPSHOT_HEADER.size
+    if len(data) < start + length:
+        raise ValueError("Snapshot is truncated")
+    return data[start:start + length], [key.encode("latin-1") for key in json.loads(data[start + length:])]
+
+class SketchServer:
+    # Newline protocol over TCP, one request per line:
+    #   <key>           count the key (no reply)
+    #   ?<key>          reply with the estimate
+    #   !top <k>        reply with a JSON list of [key, estimate], largest first
+    #   !flush          reply OK once every key sent before it on this connection is counted
+    #   !snapshot       write a snapshot now and reply with its path
+    #   !stats          reply with a JSON object of server counters
+    # Keys are queued in batches and applied by a single writer task. The queue is bounded, so a
+    # full queue stops the connections from reading and TCP flow control pushes back on producers.
+    # Queries see every key sent earlier on the same connection.
+    def __init__(self, sketch, capacity=100, batchSize=8192, maxPendingBatches=64,
+                 snapshotPath=None, snapshotInterval=30.0, candidates=()):
+        self.sketch = sketch
+        self.heavyHitters = HeavyHitters(sketch.numHashFuncs, sketch.width, capacity, sketch=sketch)
+        # Top-k candidates restored from a snapshot, at the restored sketch's estimates
+        self.heavyHitters.reseed(candidates)
+        self.batchSize = batchSize
+        self.queue = asyncio.Queue(maxPendingBatches)
+        self.snapshotPath = Path(snapshotPath) if snapshotPath else None
+        self.snapshotInterval = snapshotInterval
+        self._snapshotLock = asyncio.Lock()
+        self.ingested = 0
+        self.batches = 0
+        self.failedBatches = 0
+        self.connections = 0
+
+    async def _enqueue(self, keys, errors):
+        # The future resolves to None, or to the error when the batch could not be applied
+        applied = asyncio.get_running_loop().create_future()
+        applied.add_done_callback(lambda future: future.result() is not None and errors.append(future.result()))
+        # Blocks while the queue is full, which is the backpressure
+        await self.queue.put((keys, applied))
+        return applied
+
+    async def _applyBatches(self):
+        while True:
+            keys, applied = await self.queue.get()
+            done = [applied]
+            # Coalesce whatever else is already queued into one update
+            while len(keys) < self.batchSize and not self.queue.empty():
+                more, applied = self.queue.get_nowait()
+                keys = keys + more
+                done.append(applied)
+            error = None
+            try:
+                self.heavyHitters.insertMany(keys)
+                self.ingested += len(keys)
+                self.batches += 1
+            except Exception as exception:
+                # Keep the only writer alive; the connections see the error on their next !flush
+                error = exception
+                self.failedBatches += 1
+                print(f"Batch of {len(keys)} keys failed: {exception!r}", file=sys.stderr)
+            for applied in done:
+                applied.set_result(error)
+                self.queue.task_done()
+            # Let connections answer queries between batches
+            await asyncio.sleep(0)
+
+    async def _answer(self, line, errors):
+        if line[:1] == b"?":
+            return b"%d\n" % self.sketch.getFrequency(line[1:])
+        command, _, argument = line[1:].partition(b" ")
+        if command == b"top":
+            top = self.heavyHitters.topK(int(argument or 10))
+            return json.dumps([[key.decode(errors="replace"), int(estimate)] for key, estimate in top]).encode() + b"\n"
+        if command == b"flush":
+            if errors:
+                message = f"{len(errors)} batch(es) failed since the last flush: {errors[-1]!r}"
+                errors.clear()
+                raise ValueError(message)
+            return b"OK\n"
+        if command == b"snapshot":
+            if self.snapshotPath is None:
+                raise ValueError("Snapshots are not enabled")
+            return f"{await self.snapshot()}\n".encode()
+        if command == b"stats":
+            return json.dumps(self.summary()).encode() + b"\n"
+        raise ValueError(f"Unknown command: {command.decode(errors='replace')}")
+
+    async def _handleConnection(self, reader, writer):
+        self.connections += 1
+        lastBatch = None
+        errors = []
+        remainder = b""
+        try:
+            while True:
+                chunk = await reader.read(1 << 16)
+                data = remainder + chunk
+                lines = data.split(b"\n")
+                # A trailing partial line waits for the next chunk, unless the stream ended
+                remainder = lines.pop() if chunk else b""
+                if b"?" in data or b"!" in data:
+                    keys = []
+                    for line in lines:
+                        if line[:1] not in (b"?", b"!"):
+                            if line:
+                                keys.append(line)
+                            continue
+                        if keys:
+                            lastBatch = await self._enqueue(keys, errors)
+                            keys = []
+                        if lastBatch is not None:
+                            await lastBatch
+                        try:
+                            writer.write(await self._answer(line, errors))
+                        except ValueError as error:
+                            writer.write(f"ERR {error}\n".encode())
+                else:
+                    keys = [line for line in lines if line]
+                if keys:
+                    lastBatch = await self._enqueue(keys, errors)
+                await writer.drain()
+                if not chunk:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    def summary(self):
+        return {
+            "ingested": self.ingested,
+            "batches": self.batches,
+            "failedBatches": self.failedBatches,
+            "pendingBatches": self.queue.qsize(),
+            "connections": self.connections,
+        }
+
+    def _writeSnapshot(self, data):
+        # Write then rename, so a crash never leaves a truncated snapshot behind
+        tempPath = self.snapshotPath.with_name(self.snapshotPath.name + ".tmp")
+        tempPath.write_bytes(data)
+        os.replace(tempPath, self.snapshotPath)
+
+    async def snapshot(self):
+        async with self._snapshotLock:
+            # Serialized on the event loop so the counters cannot change mid-copy. The top-k
+            # candidates go along, the sketch alone cannot say which keys were heavy.
+            data = packSnapshot(self.sketch, list(self.heavyHitters.candidates))
+            await asyncio.to_thread(self._writeSnapshot, data)
+        return self.snapshotPath
+
+    async def _snapshotLoop(self):
+        while True:
+            await asyncio.sleep(self.snapshotInterval)
+            await self.snapshot()
+
+    async def serve(self, host="127.0.0.1", port=7070):
+        server = await asyncio.start_server(self._handleConnection, host, port)
+        tasks = [asyncio.create_task(self._applyBatches())]
+        if self.snapshotPath is not None:
+            tasks.append(asyncio.create_task(self._snapshotLoop()))
+        host, port = server.sockets[0].getsockname()[:2]
+        print(f"Serving {type(self.sketch).__name__} on {host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            # Count everything already queued before the last snapshot
+            await self.queue.join()
+            for task in tasks:
+                task.cancel()
+            if self.snapshotPath is not None:
+                print(f"Snapshot saved to: {await self.snapshot()}")
+
+def makeSketch(args):
+    # (sketch, candidate keys)
+    sketchClass = loadSketchClass(args.sketch)
+    options = {"conservative": args.conservative} if args.sketch == "cms" else {}
+    if args.restore and args.snapshot and Path(args.snapshot).exists():
+        print(f"Restoring from: {args.snapshot}")
+        sketchBytes, candidates = unpackSnapshot(Path(args.snapshot).read_bytes())
+        return sketchClass.from_bytes(sketchBytes, **options), candidates
+    return sketchClass(args.depth, args.width, **options), []
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Long-lived sketch counting service on localhost")
+    parser.add_argument("--sketch", default="cms", choices=sorted(SKETCHES))
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--width", type=int, default=20000)
+    parser.add_argument("--conservative", action="store_true")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7070)
+    parser.add_argument("--capacity", type=int, default=100, help="Candidates kept for top-k queries")
+    parser.add_argument("--batch-size", type=int, default=8192)
+    parser.add_argument("--max-pending-batches", type=int, default=64)
+    parser.add_argument("--snapshot", help="Snapshot file, written periodically and on shutdown")
+    parser.add_argument("--snapshot-interval", type=float, default=30.0)
+    parser.add_argument("--restore", action="store_true", help="Start from the snapshot file if it exists")
+    args = parser.parse_args(argv)
+
+    async def serve():
+        sketch, candidates = makeSketch(args)
+        server = SketchServer(sketch, args.capacity, args.batch_size, args.max_pending_batches,
+                              args.snapshot, args.snapshot_interval, candidates)
+        await server.serve(args.host, args.port)
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -1,74 +1,127 @@
-import sys
-from faker import Faker
-import random
-import pandas as pd
-import matplotlib.pyplot as plt
 import os
 import shutil
 from pathlib import Path
-import cv2
 import numpy as np
-from tqdm import tqdm
-import seaborn as sns
 from .SpectralBloomFilter import SpectralBloomFilter
 from common.IPV4ExperimentData import ExperimentData
-from common.miscFunctions import create_video_from_dir
+from common.instrumentation import Instrumentation, PhaseTimer
+from common.parallel import mapInOrder
+from common.resultsStore import ResultsStore, saveMetrics
 
 class MainV2:
     def __init__(self, numHashFuncs=3, width=25,
                  minInputSetSize=100, maxInputSetSize=5000, iterationStepSize=100, 
-                 distribution='random', directoryPath="/tmp/output_sbf_v2"):
+                 distribution='random', directoryPath="/tmp/output_sbf_v2", workers=1,
+                 streamVideo=False, frameStride=1, maxChangeFramesOnly=False,
+                 instrument=False, profile=False, plotIterations=None, journal=False):
         
         self.numHashFuncs = numHashFuncs
         self.width = width
         self.inputSetSizeRange = {"min": minInputSetSize, "max": maxInputSetSize, "step": iterationStepSize}
         self.distribution = distribution
         self.directoryPath = directoryPath
+        self.workers = workers
+        # Stream frames straight into one video per iteration instead of writing a PNG per insert
+        self.streamVideo = streamVideo
+        self.frameStride = frameStride
+        self.maxChangeFramesOnly = maxChangeFramesOnly
+        # Opt-in change journal, kept with each final state to rebuild any earlier step
+        self.journal = journal
+        # Opt-in phase timing, sketch stats and profiling, written to instrumentation.json by run()
+        self.instrumentation = Instrumentation(instrument, profile)
+        self.instrument = self.instrumentation.enabled
         
-        self.outputs = []
+        # Charts are optional: None skips them, "all" plots every input size, or a list of input sizes
+        self.plotIterations = plotIterations
+        
+        # Every iteration's estimates go into one table, metrics are computed once over all of them
+        self.results = ResultsStore("inputSetSize")
+        self.metrics = None
         self.filterStates = []
         
         if os.path.exists(self.directoryPath):
             shutil.rmtree(self.directoryPath)
         os.makedirs(self.directoryPath)
 
+    def __getstate__(self):
+        # Pool workers only need the configuration, not the accumulated results
+        state = self.__dict__.copy()
+        for key in ("results", "filterStates", "instrumentation"):
+            state.pop(key, None)
+        return state
+
     def _runIterations(self):
-        for inputSetSize in tqdm(range(self.inputSetSizeRange["min"], self.inputSetSizeRange["max"], self.inputSetSizeRange["step"]), desc="Running Iterations"):
-            
-            exp_data = ExperimentData(dataSetSize=100, inputSetSize=inputSetSize, distribution=self.distribution)
-            actualCounts = exp_data.get_actual_counts()
-            
-            sbf = SpectralBloomFilter(self.numHashFuncs, self.width)
-            
-            currentFilterStateItem = {"inputSetSize": inputSetSize, "state": []}
-            count = 0
-            for ip in tqdm(exp_data.inputSet, desc="Inserting IP into SBF"):
+        iterations = []
+        for inputSetSize in range(self.inputSetSizeRange["min"], self.inputSetSizeRange["max"], self.inputSetSizeRange["step"]):
+            # Data is drawn up front so the random stream does not depend on the number of workers
+            with self.instrumentation.phase("dataGeneration"):
+                exp_data = ExperimentData(dataSetSize=100, inputSetSize=inputSetSize, distribution=self.distribution)
+            with self.instrumentation.phase("groundTruth"):
+                actualCounts = exp_data.get_actual_counts()
+            iterations.append((inputSetSize, exp_data.inputSet, actualCounts))
+
+        for output, filterState, phases, stats in mapInOrder(self._runIteration, iterations, self.workers, desc="Running Iterations"):
+            self.results.add(output["inputSetSize"], output["actualCounts"], output["estimates"])
+            self.filterStates.append(filterState)
+            self.instrumentation.timer.merge(phases)
+            if stats is not None:
+                self.instrumentation.sketchStats.merge(stats)
+
+    def _plotsIteration(self, inputSetSize):
+        return self.plotIterations == "all" or (self.plotIterations is not None and inputSetSize in self.plotIterations)
+
+    def _runIteration(self, iteration):
+        from tqdm import tqdm
+        inputSetSize, inputSet, actualCounts = iteration
+        sbf = SpectralBloomFilter(self.numHashFuncs, self.width)
+        if self.journal:
+            sbf.enableJournal()
+        # Timings and stats are returned so they survive pool workers
+        timer = PhaseTimer(self.instrument)
+        if self.instrument:
+            sbf.enableStats()
+
+        # Per-insert frames are charts too, so they follow plotIterations
+        renderFrames = self._plotsIteration(inputSetSize)
+        stream = self._openVideoStream(inputSetSize, (1, self.width)) if renderFrames and self.streamVideo else None
+        currentFilterStateItem = {"inputSetSize": inputSetSize, "state": []}
+        count = 0
+        for ip in tqdm(inputSet, desc="Inserting IP into SBF"):
+            with timer.phase("sketchUpdates"):
                 sbf.insertElem(ip)
-                count+=1
-                currentFilterStateItem = {"inputSetSize": count, "state": sbf.filter}
-                self._saveCurrentFilterStateGraph(currentFilterStateItem, inputSetSize)
-            
-            estimates = {ip: sbf.getFrequency(ip) for ip in set(exp_data.inputSet)}
-            self.outputs.append({"inputSetSize": inputSetSize, "estimates": estimates, "actualCounts": actualCounts})
-            self.filterStates.append(currentFilterStateItem)
+            count+=1
+            currentFilterStateItem = {"inputSetSize": count, "state": sbf.filter}
+            with timer.phase("frameRendering"):
+                if stream is not None:
+                    stream.update([sbf.filter], f"SBF State (Width: {self.width}, Input Size: {count})")
+                elif renderFrames:
+                    self._saveCurrentFilterStateGraph(currentFilterStateItem, inputSetSize)
+        if stream is not None:
+            with timer.phase("frameRendering"):
+                stream.close()
+        # sbf.filter keeps changing, so keep a copy, plus the journal to rebuild any earlier step
+        if self.journal:
+            currentFilterStateItem = {"inputSetSize": count, "state": sbf.replay(), "journal": sbf.journal}
+        else:
+            currentFilterStateItem = {"inputSetSize": count, "state": list(sbf.filter)}
+
+        with timer.phase("queries"):
+            estimates = {ip: sbf.getFrequency(ip) for ip in set(inputSet)}
+        output = {"inputSetSize": inputSetSize, "estimates": estimates, "actualCounts": actualCounts}
+        return output, currentFilterStateItem, timer.phases, sbf.stats
 
     def _saveOutputGraph(self, outputItem):
-        df = pd.DataFrame({
-            "actualCounts": pd.Series(outputItem["actualCounts"]),
-            "estimatedCounts": pd.Series(outputItem["estimates"])
-        })
-        error = ((df["estimatedCounts"] - df["actualCounts"]) / df["actualCounts"]).mean()
-        
+        import matplotlib.pyplot as plt
         plt.figure(figsize=(12, 6))
-        df.plot(kind='bar', ax=plt.gca(), title=f"Input Size: {outputItem['inputSetSize']}, Mean Error: {error:.4f}")
+        outputItem["frame"].plot(kind='bar', ax=plt.gca(), title=f"Input Size: {outputItem['inputSetSize']}, Mean Error: {outputItem['meanRelativeError']:.4f}")
         
         savePath = Path(self.directoryPath) / str(outputItem["inputSetSize"])
         savePath.mkdir(parents=True, exist_ok=True)
         plt.savefig(savePath / "actual_vs_estimate.png")
         plt.close('all')
-        return df
-        
+
     def _saveCurrentFilterStateGraph(self, filterStateItem, parentIterationSize):
+        import matplotlib.pyplot as plt
         state = np.array(filterStateItem["state"]).reshape(1, -1)
         plt.figure(figsize=(15, 4))
         plt.imshow(state, aspect='auto', cmap='Wistia')
@@ -80,13 +133,46 @@ class MainV2:
         plt.savefig(savePath / f"filter_state_frame{filterStateItem['inputSetSize']}.png", bbox_inches='tight')
         plt.close('all')
 
+    def _openVideoStream(self, parentIterationSize, shape):
+        from common.frameStream import HeatmapVideoStream
+        savePath = Path(self.directoryPath) / str(parentIterationSize)
+        savePath.mkdir(parents=True, exist_ok=True)
+        return HeatmapVideoStream(savePath / "filter_state_video.mp4", shape,
+                                  frameStride=self.frameStride, maxChangeOnly=self.maxChangeFramesOnly)
+
+    def _saveIteration(self, outputItem):
+        timer = PhaseTimer(self.instrument)
+        with timer.phase("matplotlib"):
+            self._saveOutputGraph(outputItem)
+        return timer.phases
+
+    def plot(self, iterations="all"):
+        # On-demand charts for the chosen input sizes, read back from the results table
+        inputSetSizes = self.results.parameterValues().tolist()
+        if iterations != "all":
+            inputSetSizes = [size for size in inputSetSizes if size in set(iterations)]
+        errors = dict(zip(self.metrics["inputSetSize"].tolist(), self.metrics["meanRelativeError"].tolist()))
+        with self.instrumentation.phase("pandas"):
+            outputs = [{"inputSetSize": size, "frame": self.results.frame(size), "meanRelativeError": errors[size]}
+                       for size in inputSetSizes]
+        
+        for phases in mapInOrder(self._saveIteration, outputs, self.workers, desc="Saving Estimates"):
+            self.instrumentation.timer.merge(phases)
+
     def run(self):
         print(f"Running SBF Iterations... (Output: {self.directoryPath})")
+        self.instrumentation.start()
         self._runIterations()
-        
-        for item in tqdm(self.outputs, desc="Saving Estimates"):
-            df = self._saveOutputGraph(item)
-            df.to_csv(Path(self.directoryPath) / str(item["inputSetSize"]) / "output.csv")
+
+        with self.instrumentation.phase("metrics"):
+            self.metrics = self.results.metrics()
+        with self.instrumentation.phase("results"):
+            print(f"Results saved to: {self.results.save(self.directoryPath)}")
+            saveMetrics(self.metrics, self.directoryPath)
+        if self.plotIterations is not None:
+            self.plot(self.plotIterations)
+        self.instrumentation.stop()
+        self.instrumentation.save(self.directoryPath)
 
 if __name__ == "__main__":
     
@@ -94,12 +180,10 @@ if __name__ == "__main__":
     
     print("Spectral Bloom Filter (V2): zipf Distribution")
     dirPath = "/tmp/output_sbf_v2_zipf"
-    m_zipf = MainV2(distribution='zipf', directoryPath=dirPath, minInputSetSize=inputSize, maxInputSetSize=inputSize+1, iterationStepSize=100)
+    m_zipf = MainV2(distribution='zipf', directoryPath=dirPath, minInputSetSize=inputSize, maxInputSetSize=inputSize+1, iterationStepSize=100, streamVideo=True, plotIterations="all")
     m_zipf.run()
-    create_video_from_dir(f"{dirPath}/{inputSize}/frames")
     
     print("Spectral Bloom Filter (V2): random Distribution")
     dirPath = "/tmp/output_sbf_v2_random"
-    m_random = MainV2(distribution='random', directoryPath=dirPath, minInputSetSize=inputSize, maxInputSetSize=inputSize+1, iterationStepSize=100)
+    m_random = MainV2(distribution='random', directoryPath=dirPath, minInputSetSize=inputSize, maxInputSetSize=inputSize+1, iterationStepSize=100, streamVideo=True, plotIterations="all")
     m_random.run()
-    create_video_from_dir(f"{dirPath}/{inputSize}/frames")
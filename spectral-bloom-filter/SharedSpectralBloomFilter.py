@@ -0,0 +1,58 @@
+from .SpectralBloomFilter import SpectralBloomFilter
+from common.hashFunctions import getIPv4BatchPositions
+from common.sharedCounters import SharedLanes, checkLane
+from common.sketchSerialization import checkSeeds, decodeCounters, packSketch, unpackSketch
+
+class SharedSpectralBloomFilter(SpectralBloomFilter):
+    # Spectral Bloom Filter whose counters live in shared memory, with one lane per writer
+    # process. Each lane applies the minimum-increase update on its own and queries sum the
+    # lanes, so an estimate never under-counts inserts that returned before the query
+    # started. Lanes may over-count a little more than one filter fed the whole stream.
+    def __init__(self, numHashFuncs, width, hashing="seeded", cacheSize=0, numLanes=1, lane=0, name=None):
+        super().__init__(numHashFuncs, width, hashing, cacheSize)
+        checkLane(lane, numLanes)
+        self.shared = SharedLanes(numLanes, (self.width,), name)
+        self.lane = lane
+        self.counters = "uint64"
+        self.filter, self.counterMax = self.shared.laneCounters(lane), (1 << 64) - 1
+
+    def attach(self, lane):
+        # Same counters, writing to another lane
+        return type(self)(self.numHashFuncs, self.width, self.hasher.name, self.hasher.cacheSize,
+                          self.shared.numLanes, lane, self.shared.name)
+
+    def __reduce__(self):
+        # A copy would write to this process's lane. Other processes open the block by name
+        # with a lane of their own, or fork and call attach(lane)
+        raise TypeError(f"Cannot pickle a {type(self).__name__} bound to lane {self.lane}; "
+                        f"pass name={self.shared.name!r} and a lane to the constructor instead")
+
+    def total(self):
+        return self.shared.total()
+
+    def getFrequency(self, elem):
+        positions = self._getElementPositions(elem)
+        if self.stats is not None:
+            self.stats.recordQuery()
+        return int(self.shared.lanes[:, positions].sum(axis=0).min())
+
+    def queryIPv4Array(self, addresses):
+        positions, inverse, _ = getIPv4BatchPositions(self.hasher, addresses)
+        return self.shared.lanes[:, positions].sum(axis=0).min(axis=0)[inverse]
+
+    def to_bytes(self):
+        # The summed counters, so a snapshot loads as an ordinary filter
+        return packSketch(self, self.total())
+
+    @classmethod
+    def from_bytes(cls, data):
+        header, payload = unpackSketch(data, cls.sketchKind)
+        sketch = cls(header["numHashFuncs"], header["width"], header["hashing"])
+        checkSeeds(sketch, header)
+        sketch.shared.lane(0)[:] = decodeCounters(header, payload)
+        return sketch
+
+    def close(self):
+        self.filter.release()
+        self.filter = None
+        self.shared.close()
@@ -1,23 +1,119 @@
-import mmh3
+from common.compactCounters import makeCounters
+from common.hashFunctions import getIPv4BatchPositions, makeHashing
+from common.sketchJournal import SketchJournal
+from common.sketchSerialization import checkMergeable, checkSeeds, decodeCounters, mergeCounters, packSketch, unpackSketch
 
 class SpectralBloomFilter:
-    def __init__(self, numHashFuncs, width):
+    sketchKind = "sbf"
+
+    def __init__(self, numHashFuncs, width, hashing="seeded", cacheSize=0, counters="list"):
         self.numHashFuncs = numHashFuncs
         self.width = width
-        self.seeds = list(range(1, self.numHashFuncs + 1))
-        self.filter = [0] * self.width
+        self.hasher = makeHashing(hashing, self.numHashFuncs, self.width, cacheSize)
+        self.seeds = self.hasher.seeds
+        # counters="uint8"/"uint16"/"uint32" saturate at counterMax, "escalating" grows per counter
+        self.counters = counters
+        self.filter, self.counterMax = makeCounters(counters, self.width)
+        self.journal = None
+        self.stats = None
 
     def _getElementPositions(self, elem):
-        return [mmh3.hash(elem, seed) % self.width for seed in self.seeds]
+        return self.hasher.getPositions(elem)
 
     def insertElem(self, elem):
         positions = self._getElementPositions(elem)
+        updates = self._insertPositions(positions)
+        if self.stats is not None:
+            self.stats.recordInsert(elem, positions, updates)
+
+    def _insertPositions(self, positions):
         # SBF optimization: only increment minimums
         minVal = min(self.filter[pos] for pos in positions)
+        if minVal == self.counterMax:
+            # Every minimum is already at the cap, so estimates for this key stop growing
+            if self.stats is not None:
+                self.stats.saturated += sum(self.filter[pos] == minVal for pos in positions)
+            if self.journal is not None:
+                # An empty step keeps journal steps aligned with inserts
+                self.journal.record(())
+            return 0
+        incremented = []
         for position in positions:
             if self.filter[position] == minVal:
                 self.filter[position] += 1
+                incremented.append(position)
+        if self.journal is not None:
+            self.journal.record((0, pos, 1) for pos in incremented)
+        return len(incremented)
 
     def getFrequency(self, elem):
         positions = self._getElementPositions(elem)
-        return min(self.filter[pos] for pos in positions)
\ No newline at end of file
+        if self.stats is not None:
+            self.stats.recordQuery()
+        return min(self.filter[pos] for pos in positions)
+
+    def insertIPv4Array(self, addresses):
+        # Integer-key fast path: each distinct address is hashed once, but the
+        # minimum-increase update still runs in stream order
+        if self.stats is not None:
+            from common.ipv4Utils import ipv4ToStrings
+            for ip in ipv4ToStrings(addresses):
+                self.insertElem(ip)
+            return
+        positions, inverse, _ = getIPv4BatchPositions(self.hasher, addresses)
+        distinctPositions = positions.T.tolist()
+        for index in inverse.tolist():
+            self._insertPositions(distinctPositions[index])
+
+    def enableStats(self):
+        # Opt-in hot-path counters, see common.instrumentation
+        from common.instrumentation import SketchStats
+        self.stats = SketchStats()
+        self.hasher.instrument(self.stats)
+        return self.stats
+
+    def enableJournal(self, checkpointInterval=1000):
+        # Opt-in per-insert change log, see common.sketchJournal
+        self.journal = SketchJournal(1, self.width, checkpointInterval, [int(value) for value in self.filter])
+        return self.journal
+
+    def replay(self, upTo=None):
+        if self.journal is None:
+            raise ValueError("Journal is not enabled, call enableJournal() first")
+        return self.journal.replay(upTo)[0]
+
+    def merge(self, other):
+        # Each shard never under-counts its own keys, so neither does the sum
+        checkMergeable(self, other)
+        changes = []
+        for pos, value in enumerate(mergeCounters(other)):
+            if value:
+                old = self.filter[pos]
+                total = old + int(value)
+                if self.counterMax is not None and total > self.counterMax:
+                    if self.stats is not None:
+                        self.stats.saturated += total - self.counterMax
+                    total = self.counterMax
+                self.filter[pos] = total
+                if total > old:
+                    changes.append((0, pos, total - old))
+        if self.journal is not None:
+            self.journal.record(changes)
+        return self
+
+    def to_bytes(self):
+        return packSketch(self, self.filter)
+
+    @classmethod
+    def from_bytes(cls, data, counters="list"):
+        header, payload = unpackSketch(data, cls.sketchKind)
+        sketch = cls(header["numHashFuncs"], header["width"], header["hashing"], counters=counters)
+        checkSeeds(sketch, header)
+        values = decodeCounters(header, payload)
+        if counters == "list":
+            sketch.filter = values
+        else:
+            # Counters wider than the chosen type load saturated
+            for pos, value in enumerate(values):
+                sketch.filter[pos] = value if sketch.counterMax is None else min(value, sketch.counterMax)
+        return sketch
\ No newline at end of file
@@ -0,0 +1,63 @@
+import numpy as np
+from common.hashFunctions import makeHashing
+from common.slidingWindow import SketchRing
+
+class WindowedSpectralBloomFilter:
+    # Spectral Bloom Filter over the last numSlots slots, each slot covering eventsPerSlot
+    # inserts or slotDuration seconds. Each slot applies the minimum-increase update on
+    # its own, so the window sum never under-counts.
+    def __init__(self, numHashFuncs, width, numSlots=5, eventsPerSlot=None, slotDuration=None,
+                 hashing="seeded", cacheSize=0, clock=None):
+        self.numHashFuncs = numHashFuncs
+        self.width = width
+        self.hasher = makeHashing(hashing, self.numHashFuncs, self.width, cacheSize)
+        self.seeds = self.hasher.seeds
+        ringArgs = {"clock": clock} if clock is not None else {}
+        self.ring = SketchRing(numSlots, (self.width,), eventsPerSlot, slotDuration, **ringArgs)
+
+    @property
+    def filter(self):
+        # Counters aggregated over the live window
+        return self.ring.slots.sum(axis=0)
+
+    def _getElementPositions(self, elem):
+        return self.hasher.getPositions(elem)
+
+    def _insertPositions(self, slot, positions):
+        values = slot[positions]
+        minVal = values.min()
+        # Assignment, so a repeated position still grows by one
+        slot[positions[values == minVal]] = minVal + 1
+
+    def insertElem(self, elem, timestamp=None):
+        self.ring.roomFor(1, timestamp)
+        self._insertPositions(self.ring.currentSlot, np.asarray(self._getElementPositions(elem)))
+        self.ring.eventsInSlot += 1
+
+    def getFrequency(self, elem, timestamp=None):
+        self.ring.advance(timestamp)
+        positions = self._getElementPositions(elem)
+        return int(self.ring.slots[:, positions].sum(axis=0).min())
+
+    def insertMany(self, elems, timestamp=None):
+        # The update is order dependent, so only hashing is batched
+        elems = list(elems)
+        if not elems:
+            return
+        positions = self.hasher.getBatchPositions(elems).T
+        start = 0
+        while start < len(elems):
+            room = self.ring.roomFor(len(elems) - start, timestamp)
+            slot = self.ring.currentSlot
+            for elemPositions in positions[start:start + room]:
+                self._insertPositions(slot, elemPositions)
+            self.ring.eventsInSlot += room
+            start += room
+
+    def queryMany(self, elems, timestamp=None):
+        self.ring.advance(timestamp)
+        elems = list(elems)
+        if not elems:
+            return np.zeros(0, dtype=self.ring.slots.dtype)
+        positions = self.hasher.getBatchPositions(elems)
+        return self.ring.slots[:, positions].sum(axis=0).min(axis=0)
@@ -0,0 +1,83 @@
+import importlib
+from collections import Counter
+import numpy as np
+import pytest
+from common.ipv4Utils import ipv4ToStrings
+
+CountMinSketch = importlib.import_module("count-min-sketch.CountMinSketch").CountMinSketch
+NumpyCountMinSketch = importlib.import_module("count-min-sketch.NumpyCountMinSketch").NumpyCountMinSketch
+SpectralBloomFilter = importlib.import_module("spectral-bloom-filter.SpectralBloomFilter").SpectralBloomFilter
+
+def zipfAddresses(size=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    pool = rng.integers(0, 1 << 32, 300, dtype=np.uint64).astype(np.uint32)
+    return pool[(rng.zipf(1.2, size) - 1) % len(pool)]
+
+def counters(sketch):
+    return np.asarray(sketch.filter, dtype=np.int64).ravel().tolist()
+
+@pytest.mark.parametrize("hashing", ["seeded", "double"])
+@pytest.mark.parametrize("makeSketch", [
+    lambda hashing: CountMinSketch(3, 97, hashing),
+    lambda hashing: NumpyCountMinSketch(3, 97, hashing),
+    lambda hashing: SpectralBloomFilter(3, 97, hashing),
+    lambda hashing: SpectralBloomFilter(3, 97, hashing, counters="uint8"),
+])
+def test_ipv4_array_matches_string_inserts(makeSketch, hashing):
+    addresses = zipfAddresses()
+    batched, oneByOne = makeSketch(hashing), makeSketch(hashing)
+    batched.insertIPv4Array(addresses)
+    for ip in ipv4ToStrings(addresses):
+        oneByOne.insertElem(ip)
+    assert counters(batched) == counters(oneByOne)
+    if hasattr(batched, "queryIPv4Array"):
+        assert batched.queryIPv4Array(addresses).tolist() == [oneByOne.getFrequency(ip) for ip in ipv4ToStrings(addresses)]
+
+def test_plain_insert_many_matches_insert_elem():
+    keys = ipv4ToStrings(zipfAddresses())
+    batched, oneByOne = NumpyCountMinSketch(3, 97), CountMinSketch(3, 97)
+    batched.insertMany(keys)
+    for key in keys:
+        oneByOne.insertElem(key)
+    assert counters(batched) == counters(oneByOne)
+
+# Batched conservative inserts may differ from inserting one by one, but stay between the
+# exact counts and the plain update
+@pytest.mark.parametrize("makeSketch, insert", [
+    (lambda conservative: NumpyCountMinSketch(3, 61, conservative=conservative), "insertMany"),
+    (lambda conservative: NumpyCountMinSketch(3, 61, dtype=np.uint16, conservative=conservative), "insertMany"),
+    (lambda conservative: NumpyCountMinSketch(3, 61, conservative=conservative), "insertIPv4Array"),
+    (lambda conservative: CountMinSketch(3, 61, conservative=conservative), "insertIPv4Array"),
+])
+@pytest.mark.parametrize("batchSize", [50, 500, 5000])
+def test_conservative_batches_never_under_count(makeSketch, insert, batchSize):
+    addresses = zipfAddresses()
+    keys = ipv4ToStrings(addresses)
+    conservative, plain = makeSketch(True), makeSketch(False)
+    exact = Counter()
+    for start in range(0, len(keys), batchSize):
+        batch = slice(start, start + batchSize)
+        for sketch in (conservative, plain):
+            getattr(sketch, insert)(addresses[batch] if insert == "insertIPv4Array" else keys[batch])
+        exact.update(keys[batch])
+        # Checked after every batch, not only at the end
+        assert all(conservative.getFrequency(key) >= count for key, count in exact.items())
+    estimates = [conservative.getFrequency(key) for key in exact]
+    bounds = [plain.getFrequency(key) for key in exact]
+    assert all(estimate <= bound for estimate, bound in zip(estimates, bounds))
+    assert sum(estimates) < sum(bounds)
+
+def test_conservative_batches_of_one_match_insert_elem():
+    keys = ipv4ToStrings(zipfAddresses())
+    batched, oneByOne = NumpyCountMinSketch(3, 61, conservative=True), CountMinSketch(3, 61, conservative=True)
+    for key in keys:
+        batched.insertMany([key])
+        oneByOne.insertElem(key)
+    assert counters(batched) == counters(oneByOne)
+
+def test_narrow_batches_saturate():
+    sketch = NumpyCountMinSketch(3, 8, dtype=np.uint8)
+    sketch.insertMany(["a"] * 300 + ["b"] * 40)
+    sketch.insertIPv4Array(np.full(1000, 7, dtype=np.uint32))
+    assert sketch.getFrequency("a") == 255
+    assert int(sketch.filter.max()) == 255
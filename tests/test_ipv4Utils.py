@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+from common.ipv4Utils import ipv4FromStrings, ipv4ToBytes, ipv4ToStrings, parseIPv4Lines
+
+def parse(text):
+    return ipv4ToStrings(parseIPv4Lines(np.frombuffer(text, dtype=np.uint8)))
+
+def test_leading_address_of_every_line():
+    text = b"1.2.3.4\n10.0.0.1,GET /index.html\r\n255.255.255.255\tx\n0.0.0.0 y\n\n8.8.8.8"
+    assert parse(text) == ["1.2.3.4", "10.0.0.1", "255.255.255.255", "0.0.0.0", "8.8.8.8"]
+
+def test_empty_buffers():
+    assert parse(b"") == []
+    assert parse(b"\n\n\n") == []
+    assert parse(b"1.2.3.4\n") == ["1.2.3.4"]
+
+@pytest.mark.parametrize("line", [
+    b"256.1.1.1", b"1.2.3.256", b"1000.1.1.1", b"01.2.3.4", b"1.2.3.04", b"1.2.3", b"1.2.3.4.5",
+    b"1..2.3", b"1.2.3.", b".1.2.3.4", b" 1.2.3.4", b"1.2.3.4x", b"1.2.3.4:80", b"999999999999999",
+])
+def test_invalid_lines_are_skipped(line):
+    # Skipped on its own and without disturbing the lines around it
+    assert parse(line) == []
+    assert parse(b"9.9.9.9\n" + line + b"\n7.7.7.7") == ["9.9.9.9", "7.7.7.7"]
+
+def test_round_trip_with_strings():
+    addresses = np.random.default_rng(0).integers(0, 1 << 32, 1000, dtype=np.uint64).astype(np.uint32)
+    text = "\n".join(ipv4ToStrings(addresses)).encode()
+    assert np.array_equal(parseIPv4Lines(np.frombuffer(text, dtype=np.uint8)), addresses)
+    assert np.array_equal(ipv4FromStrings(ipv4ToStrings(addresses)), addresses)
+    assert ipv4ToBytes(addresses) == [ip.encode() for ip in ipv4ToStrings(addresses)]
@@ -0,0 +1,62 @@
+import importlib
+import numpy as np
+import pytest
+
+CountMinSketch = importlib.import_module("count-min-sketch.CountMinSketch").CountMinSketch
+NumpyCountMinSketch = importlib.import_module("count-min-sketch.NumpyCountMinSketch").NumpyCountMinSketch
+SpectralBloomFilter = importlib.import_module("spectral-bloom-filter.SpectralBloomFilter").SpectralBloomFilter
+
+# Narrow widths and counter types so the fixed-width counters saturate during the run
+SKETCHES = {
+    "cms": lambda: CountMinSketch(3, 8),
+    "cms-conservative": lambda: CountMinSketch(3, 8, conservative=True),
+    "numpy-uint8": lambda: NumpyCountMinSketch(3, 4, dtype=np.uint8),
+    "numpy-uint8-conservative": lambda: NumpyCountMinSketch(3, 4, dtype=np.uint8, conservative=True),
+    "sbf": lambda: SpectralBloomFilter(3, 8),
+    "sbf-uint8": lambda: SpectralBloomFilter(2, 3, counters="uint8"),
+    "sbf-escalating": lambda: SpectralBloomFilter(2, 3, counters="escalating"),
+}
+
+def liveState(sketch):
+    if isinstance(sketch, SpectralBloomFilter):
+        return [[int(value) for value in sketch.filter]]
+    return [[int(value) for value in row] for row in sketch.filter]
+
+@pytest.mark.parametrize("name", SKETCHES)
+def test_replay_matches_live_state_after_every_insert(name):
+    sketch = SKETCHES[name]()
+    journal = sketch.enableJournal(checkpointInterval=256)
+    states = [liveState(sketch)]
+    for i in range(3000):
+        sketch.insertElem(str(i % 7))
+        states.append(liveState(sketch))
+
+    # One step per insert, saturated or not
+    assert journal.steps == 3000
+    for step, state in enumerate(states):
+        assert journal.replay(step) == state
+    if getattr(sketch, "counterMax", None) is not None and name != "sbf-escalating":
+        assert max(max(row) for row in states[-1]) == sketch.counterMax
+
+def test_step_changes_belong_to_their_insert():
+    sketch = SpectralBloomFilter(2, 3, counters="uint8")
+    journal = sketch.enableJournal()
+    for i in range(1000):
+        before = liveState(sketch)[0]
+        sketch.insertElem(str(i % 5))
+        after = liveState(sketch)[0]
+        changes = journal.stepChanges(i + 1)
+        assert sorted((column, delta) for _, column, delta in changes) == \
+            [(pos, after[pos] - before[pos]) for pos in range(sketch.width) if after[pos] != before[pos]]
+
+def test_merge_is_one_step():
+    sketch = NumpyCountMinSketch(3, 16)
+    other = NumpyCountMinSketch(3, 16)
+    other.insertMany(["a", "b", "a"])
+    journal = sketch.enableJournal()
+    sketch.insertElem("c")
+    afterInsert = liveState(sketch)
+    sketch.merge(other)
+    assert journal.steps == 2
+    assert journal.replay(1) == afterInsert
+    assert journal.replay() == liveState(sketch)
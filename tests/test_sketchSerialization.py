@@ -0,0 +1,102 @@
+import importlib
+import numpy as np
+import pytest
+from common.sketchSerialization import HEADER
+
+CountMinSketch = importlib.import_module("count-min-sketch.CountMinSketch").CountMinSketch
+NumpyCountMinSketch = importlib.import_module("count-min-sketch.NumpyCountMinSketch").NumpyCountMinSketch
+SharedCountMinSketch = importlib.import_module("count-min-sketch.SharedCountMinSketch").SharedCountMinSketch
+SpectralBloomFilter = importlib.import_module("spectral-bloom-filter.SpectralBloomFilter").SpectralBloomFilter
+SharedSpectralBloomFilter = importlib.import_module("spectral-bloom-filter.SharedSpectralBloomFilter").SharedSpectralBloomFilter
+
+SKETCH_CLASSES = [CountMinSketch, NumpyCountMinSketch, SpectralBloomFilter]
+
+def stream(size=2000, keys=50, seed=0):
+    rng = np.random.default_rng(seed)
+    return [str(key) for key in rng.zipf(1.3, size) % keys]
+
+def counters(sketch):
+    return np.asarray(sketch.filter, dtype=np.int64).ravel().tolist()
+
+@pytest.mark.parametrize("hashing", ["seeded", "double"])
+@pytest.mark.parametrize("sketchClass", SKETCH_CLASSES)
+def test_bytes_round_trip(sketchClass, hashing):
+    sketch = sketchClass(3, 64, hashing)
+    for key in stream():
+        sketch.insertElem(key)
+    loaded = sketchClass.from_bytes(sketch.to_bytes())
+    assert loaded.hasher.name == hashing
+    assert counters(loaded) == counters(sketch)
+    assert all(loaded.getFrequency(key) == sketch.getFrequency(key) for key in set(stream()))
+
+def test_bytes_load_across_cms_classes():
+    sketch = CountMinSketch(3, 64)
+    for key in stream():
+        sketch.insertElem(key)
+    assert counters(NumpyCountMinSketch.from_bytes(sketch.to_bytes())) == counters(sketch)
+
+def test_narrow_counters_load_saturated():
+    sketch = SpectralBloomFilter(2, 4)
+    for _ in range(300):
+        sketch.insertElem("a")
+    loaded = SpectralBloomFilter.from_bytes(sketch.to_bytes(), counters="uint8")
+    assert loaded.getFrequency("a") == 255
+
+@pytest.mark.parametrize("sketchClass", [CountMinSketch, NumpyCountMinSketch])
+def test_merged_cms_shards_equal_one_sketch(sketchClass):
+    keys = stream()
+    whole, left, right = sketchClass(3, 64), sketchClass(3, 64), sketchClass(3, 64)
+    for i, key in enumerate(keys):
+        whole.insertElem(key)
+        (left if i % 2 else right).insertElem(key)
+    assert counters(left.merge(right)) == counters(whole)
+
+def test_merged_sbf_shards_never_under_count():
+    keys = stream()
+    left, right = SpectralBloomFilter(3, 64), SpectralBloomFilter(3, 64)
+    for i, key in enumerate(keys):
+        (left if i % 2 else right).insertElem(key)
+    left.merge(right)
+    assert all(left.getFrequency(key) >= keys.count(key) for key in set(keys))
+
+def test_narrow_merge_saturates():
+    sketch = NumpyCountMinSketch(3, 16, dtype=np.uint8)
+    other = NumpyCountMinSketch(3, 16)
+    sketch.insertMany(["a"] * 200)
+    other.insertMany(["a"] * 200)
+    assert sketch.merge(other).getFrequency("a") == 255
+
+@pytest.mark.parametrize("sharedClass, plainClass", [(SharedCountMinSketch, NumpyCountMinSketch),
+                                                     (SharedSpectralBloomFilter, SpectralBloomFilter)])
+def test_merging_a_shared_sketch_adds_every_lane(sharedClass, plainClass):
+    shared = sharedClass(3, 10, numLanes=3)
+    try:
+        for lane in range(3):
+            worker = shared.attach(lane)
+            worker.insertElem("a")
+            worker.close()
+        assert shared.getFrequency("a") == 3
+        assert plainClass(3, 10).merge(shared).getFrequency("a") == 3
+    finally:
+        shared.close()
+
+@pytest.mark.parametrize("other, message", [
+    (lambda: NumpyCountMinSketch(3, 32), "width"),
+    (lambda: NumpyCountMinSketch(4, 64), "numHashFuncs"),
+    (lambda: NumpyCountMinSketch(3, 64, "double"), "hashing"),
+    (lambda: SpectralBloomFilter(3, 64), "Cannot merge"),
+])
+def test_merge_rejects_incompatible_sketches(other, message):
+    with pytest.raises(ValueError, match=message):
+        NumpyCountMinSketch(3, 64).merge(other())
+
+def test_from_bytes_rejects_bad_headers():
+    data = NumpyCountMinSketch(2, 5).to_bytes()
+    fields = list(HEADER.unpack_from(data))
+    with pytest.raises(ValueError):
+        NumpyCountMinSketch.from_bytes(data[:HEADER.size - 1])
+    with pytest.raises(ValueError):
+        SpectralBloomFilter.from_bytes(data)
+    fields[3] = 9
+    with pytest.raises(ValueError, match="hashing"):
+        NumpyCountMinSketch.from_bytes(HEADER.pack(*fields) + data[HEADER.size:])
@@ -0,0 +1,37 @@
+import importlib
+import pytest
+from common.slidingWindow import SketchRing
+
+WindowedCountMinSketch = importlib.import_module("count-min-sketch.WindowedCountMinSketch").WindowedCountMinSketch
+WindowedSpectralBloomFilter = importlib.import_module("spectral-bloom-filter.WindowedSpectralBloomFilter").WindowedSpectralBloomFilter
+
+@pytest.mark.parametrize("start", [0.0, 1.7e9])
+@pytest.mark.parametrize("sketchClass", [WindowedCountMinSketch, WindowedSpectralBloomFilter])
+def test_rotation_follows_explicit_timestamps(sketchClass, start):
+    # Event time and epoch time both start a fresh window, whatever the monotonic clock says
+    sketch = sketchClass(3, 100, numSlots=3, slotDuration=10)
+    sketch.insertElem("a", timestamp=start)
+    sketch.insertElem("a", timestamp=start + 5)
+    assert sketch.getFrequency("a", timestamp=start + 9) == 2
+
+    sketch.insertElem("b", timestamp=start + 15)
+    assert sketch.getFrequency("a", timestamp=start + 25) == 2
+    assert sketch.getFrequency("b", timestamp=start + 25) == 1
+
+    # The slot holding both "a" inserts is the oldest one and drops out at start + 30
+    assert sketch.getFrequency("a", timestamp=start + 30) == 0
+    assert sketch.getFrequency("b", timestamp=start + 30) == 1
+    assert sketch.getFrequency("b", timestamp=start + 1000) == 0
+
+def test_batch_inserts_rotate_with_timestamps():
+    sketch = WindowedCountMinSketch(3, 100, numSlots=2, slotDuration=1)
+    sketch.insertMany(["a"] * 4, timestamp=100.0)
+    sketch.insertMany(["a"] * 3, timestamp=101.5)
+    assert sketch.queryMany(["a"], timestamp=101.9).tolist() == [7]
+    assert sketch.queryMany(["a"], timestamp=102.0).tolist() == [3]
+
+def test_clock_and_caller_timestamps_do_not_mix():
+    ring = SketchRing(2, (4,), slotDuration=1, clock=lambda: 0.0)
+    ring.advance(5.0)
+    with pytest.raises(ValueError):
+        ring.advance()